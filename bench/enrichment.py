@@ -0,0 +1,108 @@
+"""
+Counts the SQLite queries and time spent enriching Helix data for the
+stream pages (`Fetch.stream_info`) and the clip view (`process_data`).
+Runs offline against a throwaway data.db with every streamer and game
+already cached, so only the enrichment step itself is measured.
+
+Usage: python bench/enrichment.py [items per page ...]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+home = tempfile.mkdtemp(prefix="twitch-py-bench-")
+os.environ["HOME"] = home
+os.makedirs(f"{home}/.config/twitch-py")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import main  # noqa: E402
+
+queries = 0
+execute_sql = main.db.execute_sql
+
+
+def counted(sql, params=None, *args, **kwargs):
+    global queries
+    queries += 1
+    return execute_sql(sql, params, *args, **kwargs)
+
+
+def populate(n: int) -> None:
+    main.db.create_tables(
+        [main.User, main.Streamer, main.Game, main.State]
+        + list(main.Search.indexes.values())
+    )
+    main.User.create(
+        id=1, login="me", display_name="Me", profile_image_url="", access_token="x"
+    )
+    main.Db.upsert(
+        main.Streamer,
+        [
+            {
+                "id": i,
+                "login": f"user{i}",
+                "display_name": f"User{i}",
+                "profile_image_url": f"/cache/users/{i}.jpg",
+            }
+            for i in range(n)
+        ],
+    )
+    main.Db.upsert(
+        main.Game,
+        [
+            {"id": i, "name": f"Game{i}", "box_art_url": f"/cache/games/{i}.jpg"}
+            for i in range(1, n)
+        ],
+    )
+
+
+def streams(n: int) -> list[dict]:
+    return [
+        {
+            "user_id": str(i),
+            "game_id": str(i % 20) if i % 20 else "",
+            "viewer_count": i,
+            "started_at": "2024-01-01T00:00:00Z",
+            "thumbnail_url": f"https://cdn/live_user_user{i}-{{width}}x{{height}}.jpg",
+        }
+        for i in range(n)
+    ]
+
+
+def clips(n: int) -> list[dict]:
+    return [
+        {
+            "id": f"c{i}",
+            "game_id": str(i % 20) if i % 20 else "",
+            "video_id": "",
+            "created_at": "2024-01-01T00:00:00Z",
+            "thumbnail_url": f"https://cdn/clip{i}-preview-480x272.jpg",
+        }
+        for i in range(n)
+    ]
+
+
+def measure(label: str, fn, data: list[dict]) -> None:
+    global queries
+    queries = 0
+    start = time.perf_counter()
+    fn(data)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{label:<14}{len(data):>6}{queries:>10}{elapsed:>12.1f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [50, 100, 500]
+    main.db.init(f"{home}/.config/twitch-py/data.db")
+    populate(max(sizes))
+    main.db.execute_sql = counted
+    print(f"{'page':<14}{'items':>6}{'queries':>10}{'ms':>12}")
+    try:
+        for size in sizes:
+            measure("streams", main.Fetch.stream_info, streams(size))
+            measure("clips", lambda d: main.process_data(d, "clip"), clips(size))
+    finally:
+        shutil.rmtree(home)
@@ -0,0 +1,339 @@
+"""
+Measures every page against a fake Helix API and image CDN, for synthetic
+users following 100 to 10,000 channels. Per route it records the wall time
+of a cold request (empty caches) and of a warm one, the Helix and CDN
+requests sent, the SQLite statements run and the peak memory allocated.
+The initial cache build of the follows runs to completion beforehand.
+
+Nothing leaves the machine: requests go through an httpx MockTransport
+that answers like Helix, with configurable latency, page size and rate
+limit. Each follow count runs in its own process with a throwaway home
+directory, so no state is shared between rows.
+
+Usage: python bench/routes.py [--follows N ...] [--latency S] [--page-size N]
+                              [--rate-limit N] [--window S]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from urllib.parse import parse_qs
+from wsgiref.util import setup_testing_defaults
+
+import toml
+
+src = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+class FakeHelix:
+    """Stand-in for api.twitch.tv and the image CDN"""
+
+    def __init__(
+        self, follows: int, latency: float, page_size: int, limit: int, window: float
+    ):
+        self.follows = [1000 + i for i in range(follows)]
+        self.latency, self.page_size = latency, page_size
+        self.limit, self.window = limit, window
+        self.remaining, self.reset = limit, time.time() + window
+        self.lock = threading.Lock()
+        self.counts = {"helix": 0, "cdn": 0, "throttled": 0}
+
+    def __call__(self, request):
+        """MockTransport handler: sleeps in the caller's style, sync or async"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            time.sleep(self.latency)
+            return self.respond(request)
+
+        async def respond():
+            await asyncio.sleep(self.latency)
+            return self.respond(request)
+
+        return respond()
+
+    def respond(self, request):
+        import httpx
+
+        url = request.url
+        if url.host != "api.twitch.tv":
+            with self.lock:
+                self.counts["cdn"] += 1
+            return httpx.Response(200, content=b"\xff\xd8\xff" + bytes(2048))
+        with self.lock:
+            self.counts["helix"] += 1
+            if time.time() >= self.reset:
+                self.remaining, self.reset = self.limit, time.time() + self.window
+            throttled = self.remaining == 0
+            self.remaining = max(self.remaining - 1, 0)
+            headers = {
+                "Ratelimit-Limit": str(self.limit),
+                "Ratelimit-Remaining": str(self.remaining),
+                "Ratelimit-Reset": str(int(self.reset)),
+            }
+            if throttled:
+                self.counts["throttled"] += 1
+        if throttled:
+            return httpx.Response(
+                429, json={"error": "Too Many Requests"}, headers=headers
+            )
+        query = parse_qs(
+            url.query.decode() if isinstance(url.query, bytes) else url.query
+        )
+        data, cursor = self.route(request.method, url.path[len("/helix") :], query)
+        body = {"data": data, "pagination": {"cursor": cursor} if cursor else {}}
+        return httpx.Response(
+            200 if data is not None else 204, json=body, headers=headers
+        )
+
+    def page(self, items: list, query: dict) -> tuple[list, str]:
+        after = int(query.get("after", ["0"])[0])
+        first = min(int(query.get("first", ["20"])[0]), self.page_size)
+        end = after + first
+        return items[after:end], str(end) if end < len(items) else None
+
+    def route(self, method: str, path: str, query: dict) -> tuple[list, str]:
+        if path == "/users" and "id" not in query:
+            return [self.user(1)], None
+        if path == "/users":
+            return [self.user(int(i)) for i in query["id"]], None
+        if path == "/games":
+            return [self.game(int(i)) for i in query["id"]], None
+        if path == "/users/follows" and method == "GET":
+            return self.page([{"to_id": str(i)} for i in self.follows], query)
+        if path == "/users/follows":
+            return None, None
+        if path == "/streams":
+            if "user_id" in query:
+                ids = [int(i) for i in query["user_id"] if int(i) % 3 == 0]
+            else:
+                ids = list(range(50_000, 50_100))
+            return self.page([self.stream(i) for i in ids], query)
+        if path == "/games/top":
+            return self.page([self.game(i) for i in range(1, 201)], query)
+        if path.startswith("/search/"):
+            first = int(query.get("first", ["20"])[0])
+            if path.endswith("categories"):
+                return [self.game(i) for i in range(1, first + 1)], None
+            return [self.channel(1000 + i) for i in range(first)], None
+        if path == "/videos" and "id" in query:
+            return [self.vod(int(i)) for i in query["id"]], None
+        if path == "/videos":
+            return self.page([self.vod(i) for i in range(1, 91)], query)
+        if path == "/clips":
+            return [self.clip(i) for i in range(50)], None
+        return [], None
+
+    def user(self, i: int) -> dict:
+        return {
+            "id": str(i),
+            "login": f"user{i}",
+            "display_name": f"User{i}",
+            "broadcaster_type": "affiliate" if i % 4 else "",
+            "description": f"Streams games number {i % 200}",
+            "offline_image_url": "",
+            "profile_image_url": f"https://cdn.example/users/{i}-300x300.png",
+        }
+
+    def game(self, i: int) -> dict:
+        return {
+            "id": str(i),
+            "name": f"Game {i}",
+            "box_art_url": f"https://cdn.example/games/{i}-{{width}}x{{height}}.jpg",
+        }
+
+    def stream(self, i: int) -> dict:
+        return {
+            "id": f"s{i}",
+            "user_id": str(i),
+            "user_login": f"user{i}",
+            "user_name": f"User{i}",
+            "game_id": str(i % 200 + 1),
+            "game_name": f"Game {i % 200 + 1}",
+            "title": f"Stream {i}",
+            "viewer_count": i,
+            "started_at": "2024-01-01T00:00:00Z",
+            "thumbnail_url": f"https://cdn.example/live_user{i}-{{width}}x{{height}}.jpg",
+        }
+
+    def channel(self, i: int) -> dict:
+        return {
+            "id": str(i),
+            "display_name": f"User{i}",
+            "broadcaster_login": f"user{i}",
+            "is_live": i % 3 == 0,
+            "game_name": "Game",
+            "title": f"Stream {i}",
+        }
+
+    def vod(self, i: int) -> dict:
+        return {
+            "id": str(i),
+            "title": f"Vod {i}",
+            "url": f"https://www.twitch.tv/videos/{i}",
+            "thumbnail_url": "https://cdn.example/vod-%{width}x%{height}.jpg",
+            "created_at": "2024-01-01T00:00:00Z",
+            "duration": "3h2m1s",
+            "view_count": i,
+        }
+
+    def clip(self, i: int) -> dict:
+        return {
+            "id": f"c{i}",
+            "title": f"Clip {i}",
+            "url": f"https://clips.twitch.tv/c{i}",
+            "thumbnail_url": f"https://cdn.example/c{i}-preview-480x272.jpg",
+            "created_at": "2024-01-01T01:00:00Z",
+            "view_count": i,
+            "game_id": str(i % 200 + 1) if i % 4 else "",
+            "video_id": str(i % 90 + 1) if i % 5 else "",
+        }
+
+
+def one(args) -> list[dict]:
+    """Benchmark every route for one follow count, in this process"""
+    home = tempfile.mkdtemp(prefix="twitch-py-bench-")
+    conf = f"{home}/.config/twitch-py"
+    os.environ["HOME"] = home
+    shutil.copytree(f"{src}/static", f"{conf}/static")
+    shutil.copytree(f"{src}/views", f"{conf}/views")
+    settings = toml.load(f"{conf}/static/settings.toml")
+    settings.setdefault("log", {})["level"] = "error"
+    # Warming categories after /top/games would make /categories/1 start warm
+    settings.setdefault("prefetch", {})["categories"] = 0
+    with open(f"{conf}/static/settings.toml", "w") as f:
+        toml.dump(settings, f)
+    sys.path.insert(0, src)
+
+    import bottle
+    import httpx
+    import main
+
+    fake = FakeHelix(
+        args.one, args.latency, args.page_size, args.rate_limit, args.window
+    )
+    transport = httpx.MockTransport(fake)
+    options = main.Session.options
+    main.Session.options = staticmethod(lambda: {**options(), "transport": transport})
+    queries = 0
+    execute_sql = main.db.execute_sql
+
+    def counted(sql, params=None, *a, **kw):
+        nonlocal queries
+        queries += 1
+        return execute_sql(sql, params, *a, **kw)
+
+    main.db.execute_sql = counted
+    app = bottle.app()
+
+    def get(path: str) -> str:
+        path, _, query = path.partition("?")
+        env = {"PATH_INFO": path, "QUERY_STRING": query}
+        setup_testing_defaults(env)
+        status = []
+        b"".join(app(env, lambda s, h, e=None: status.append(s)))
+        return status[0]
+
+    def settle() -> None:
+        """Wait for background downloads to stop sending requests"""
+        quiet = max(0.1, 5 * args.latency)
+        while True:
+            counts = dict(fake.counts)
+            time.sleep(quiet)
+            if counts == fake.counts:
+                return
+
+    get("/authenticate?access_token=bench")
+    # The first page starts the cache build in the background. It and the
+    # image downloads it queues finish before measuring, so their Helix, CDN
+    # and SQL traffic is not counted against a route
+    get("/build")
+    if main.Build.thread is not None:
+        main.Build.thread.join()
+    settle()
+    login, start, end = f"user{fake.follows[0]}", "2024-01-01", "2024-01-08"
+    routes = [
+        "/",
+        "/?part=1",
+        "/following",
+        "/top/channels?part=1",
+        "/top/games?part=1",
+        "/categories/1?part=1",
+        "/search?q=user10&t=channels",
+        "/search?q=user10&t=channels&remote=1",
+        "/search?q=game&t=categories&remote=1",
+        f"/{login}?vod=archive&part=1",
+        f"/{login}?clips=range&start={start}&end={end}&part=1",
+    ]
+    rows = []
+    tracemalloc.start()
+    for route in routes:
+        row = {"follows": args.one, "route": route}
+        for run in ["cold", "warm"]:
+            helix, cdn, queries = fake.counts["helix"], fake.counts["cdn"], 0
+            tracemalloc.reset_peak()
+            began = time.perf_counter()
+            status = get(route)
+            row[run] = (time.perf_counter() - began) * 1000
+            settle()  # Downloads a route queues count against it
+            if run == "cold":
+                row["status"] = status.split()[0]
+                row["helix"] = fake.counts["helix"] - helix
+                row["cdn"] = fake.counts["cdn"] - cdn
+                row["queries"] = queries
+                row["peak_kib"] = tracemalloc.get_traced_memory()[1] / 1024
+        rows.append(row)
+    tracemalloc.stop()
+    main.Session.close()
+    shutil.rmtree(home, ignore_errors=True)
+    return rows
+
+
+def report(rows: list[dict]) -> None:
+    print(
+        f"{'follows':>7}  {'route':<48}{'status':>6}{'cold ms':>9}{'warm ms':>9}"
+        f"{'helix':>7}{'cdn':>6}{'queries':>9}{'peak KiB':>10}"
+    )
+    for r in rows:
+        route = r["route"] if len(r["route"]) <= 46 else r["route"][:45] + "…"
+        print(
+            f"{r['follows']:>7}  {route:<48}{r['status']:>6}{r['cold']:>9.1f}"
+            f"{r['warm']:>9.1f}{r['helix']:>7}{r['cdn']:>6}{r['queries']:>9}"
+            f"{r['peak_kib']:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--follows", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="seconds per request"
+    )
+    parser.add_argument(
+        "--page-size", type=int, default=100, help="largest page served"
+    )
+    parser.add_argument("--rate-limit", type=int, default=800, help="points per window")
+    parser.add_argument("--window", type=float, default=60, help="seconds per bucket")
+    parser.add_argument("--json", action="store_true", help="print rows as JSON")
+    parser.add_argument("--one", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.one is not None:
+        print(json.dumps(one(args)))
+        sys.exit()
+    rows = []
+    for follows in args.follows:
+        command = [sys.executable, __file__, *sys.argv[1:], "--one", str(follows)]
+        out = subprocess.run(command, capture_output=True, text=True, check=True)
+        rows += json.loads(out.stdout.strip().splitlines()[-1])
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        report(rows)
@@ -1,30 +1,179 @@
 import asyncio
+import bisect
+import contextlib
+import copy
+import functools
+import gzip
+import hashlib
+import importlib.util
+import json
+import mimetypes
+import random
+import re
 import shutil
-from collections import namedtuple
-from concurrent.futures.thread import ThreadPoolExecutor
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import Future
 from datetime import datetime, timedelta, timezone
 from shlex import split as lex
-from subprocess import DEVNULL, Popen
+from subprocess import DEVNULL, PIPE, Popen, TimeoutExpired
 
 import bottle as bt
 import httpx
 import peewee as pw
 import toml
+from playhouse.pool import PooledSqliteDatabase
+from playhouse.shortcuts import model_to_dict
+from playhouse.sqlite_ext import FTS5Model, RowIDField, SearchField
 from waitress import serve
 
 confdir = shutil.os.path.expanduser("~") + "/.config/twitch-py"
+os_ = shutil.sys.platform.lower()
 bt.TEMPLATE_PATH.insert(0, f"{confdir}/views")
 cachedir = shutil.os.path.expanduser("~") + "/.cache/twitch-py"
-db = pw.SqliteDatabase(f"{confdir}/data.db")
-os_ = shutil.sys.platform.lower()
+
+
+class Database(PooledSqliteDatabase):
+    """Pooled data.db connection whose statements are timed in `Metrics`"""
+
+    def execute_sql(self, sql, params=None, *args, **kwargs):
+        with Metrics.timed("db_query_seconds", statement=sql.split(" ", 1)[0]):
+            return super().execute_sql(sql, params, *args, **kwargs)
+
+
+db = Database(  # One reusable connection per server thread
+    f"{confdir}/data.db",
+    max_connections=32,
+    stale_timeout=300,
+    timeout=10,
+    check_same_thread=False,  # Pooled connections move between threads
+    pragmas={
+        "journal_mode": "wal",  # Readers and the writer do not block each other
+        "synchronous": "normal",  # With WAL, fsync only at checkpoints
+        "cache_size": -16 * 1024,  # 16MB page cache per connection
+        "temp_store": "memory",
+        "busy_timeout": 5000,
+    },
+)
 Image = namedtuple("Image", "id url")
 Result = namedtuple("Result", "query model")
+Record = namedtuple("Record", "at level message")
+
+
+class Config:
+    """
+    Reads sections of `settings.toml`, falling back to built-in defaults for
+    any section or key missing from the user's file
+    """
+
+    path = f"{confdir}/static/settings.toml"
+    lock = threading.Lock()
+    parsed = {"mtime": None, "settings": {}}  # Last read of settings.toml
+    defaults = {
+        os_: {"multi": False, "app": "mpv", "args": ""},  # Player, per platform
+        "network": {
+            "http2": True,
+            "max_connections": 20,
+            "max_keepalive_connections": 10,
+            "keepalive_expiry": 30.0,
+            "timeout": 10.0,
+            "connect_timeout": 5.0,
+        },
+        "helix": {
+            "max_in_flight": 8,  # Helix requests sent at once, across all pages
+            "reserve": 10,  # Points kept back before waiting for the bucket to reset
+            "retries": 3,  # For 429 and 5xx responses or network errors
+            "backoff": 1.0,  # Seconds before first retry, doubled on each retry
+        },
+        "sync": {
+            "follows_interval": 300,  # Seconds between background follow syncs
+            "settle": 30,  # Seconds a toggled follow is trusted over Helix
+        },
+        "images": {
+            "concurrency": 8,  # Simultaneous image downloads
+            "retries": 3,
+            "backoff": 0.5,  # Seconds before first retry, doubled on each retry
+            "budget_mb": 200,  # Least recently used images are evicted past this
+        },
+        "build": {
+            "step": 1000,  # Follows cached (and marked followed) at a time
+            "retry": 30,  # Seconds before a failed step is tried again
+        },
+        "player": {
+            "streamlink": "streamlink",  # Command used to open live streams
+            "prefetch": 0,  # Top followed live streams whose urls are resolved ahead
+            "resolve_ttl": 60,  # Seconds a resolved stream url is used for
+        },
+        "log": {
+            "level": "info",  # Least severe of debug, info, warning and error shown
+            "buffer": 200,  # Records kept for the terminal
+            "redraw_hz": 4.0,  # Terminal redraws per second at most
+            "file": "",  # Path records of every level are appended to, if set
+        },
+        "thumbs": {
+            "live_ttl": 300,  # Seconds, as often as Twitch renews live previews
+            "ttl": 3600,  # Seconds for vod and clip thumbnails
+            "max_entries": 500,  # Thumbnails kept in memory
+            "max_sources": 5000,  # CDN urls of rendered thumbnails remembered
+        },
+        "events": {
+            "interval": 30,  # Seconds between polls of live follows, while watched
+            "keepalive": 15,  # Seconds between comments keeping event streams open
+            "max_subscribers": 4,  # Open event streams, each holding a server thread
+        },
+        "snapshot": {  # Seconds before a page's data is refreshed
+            "live_ttl": 60,
+            "top_channels_ttl": 120,
+            "top_games_ttl": 600,
+            "category_ttl": 120,
+            "channel_vods_ttl": 300,  # First page of a channel's vods
+            "vod_ttl": 600,  # Vod details looked up for clips
+            "max_entries": 200,  # A count: category and channel snapshots kept
+        },
+        "prefetch": {  # Warming pages a click is likely to open next
+            "categories": 6,  # Top categories warmed once /top/games is shown
+            "per_minute": 30,  # Prefetches started per minute at most
+            "spare": 400,  # Helix rate limit points left untouched by prefetches
+        },
+    }
+
+    @staticmethod
+    def read() -> dict:
+        """Parsed settings.toml, parsed again only once its mtime changes"""
+        try:
+            mtime = shutil.os.stat(Config.path).st_mtime_ns
+        except OSError:
+            return {}
+        with Config.lock:
+            if Config.parsed["mtime"] != mtime:
+                Config.parsed["mtime"] = mtime
+                try:
+                    Config.parsed["settings"] = toml.load(Config.path)
+                except (OSError, toml.TomlDecodeError) as e:
+                    # A typo must not silently reset every section to defaults
+                    Config.parsed["error"] = (
+                        f"Could not read settings.toml, keeping the settings "
+                        f"last read (or the defaults): {e}"
+                    )
+            settings = Config.parsed["settings"]
+            # Reported once the log exists, as it reads its own settings first
+            error = Config.parsed.pop("error", None) if "Log" in globals() else None
+        if error:
+            Log.warning(error)
+        return settings
+
+    @staticmethod
+    def load(section: str) -> dict:
+        """Merge `section` of settings.toml over its defaults"""
+        return {**Config.defaults.get(section, {}), **Config.read().get(section, {})}
 
 
 class App:
-    process: Popen = None  # Holds process id of current stream/vod
     url = "http://localhost:8080/"  # Index page of local site
-    messages = []  # Log of events since application start
+    compressible = (".css", ".js", ".html", ".toml")  # Served gzipped from /static
+    vods_per_page = 30
     errors = {
         400: "Bad Request",
         404: "Not Found",
@@ -33,13 +182,128 @@ class App:
     }
 
     @staticmethod
-    def display(message: str = "") -> None:
+    def deferred(key: str = None) -> str:
+        """
+        Url a page's data section is fetched from once its shell has been sent,
+        or None if the data is at hand (the snapshot of `key` exists) or
+        is itself being requested (`part=1`)
+        """
+        query = bt.request.query
+        if query.get("part"):
+            return None
+        if key and Snapshot.ready(key) and not query.get("refresh"):
+            return None
+        return App.fragment()
+
+    @staticmethod
+    def fragment(refresh: bool = False) -> str:
+        """Url of the current page's data section (`part=1`)"""
+        params = [bt.request.query_string, "part=1", "refresh=1" if refresh else ""]
+        return f"{bt.request.path}?{'&'.join(filter(None, params))}"
+
+
+class Log:
+    """
+    Event log. Request threads only append a record to a ring buffer; one
+    background thread redraws the terminal at a capped rate when stdout is
+    a TTY (or prints new lines when it is not) and writes the log file
+    """
+
+    levels = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+    records: deque[Record] = deque(maxlen=Config.load("log")["buffer"])
+    pending: deque[Record] = deque(maxlen=10_000)  # Not yet printed or written
+    changed = threading.Event()
+    thread: threading.Thread = None
+    lock = threading.Lock()  # Held while writing to the terminal or file
+    appending = threading.Lock()  # Held briefly around changes to the deques
+    starting = threading.Lock()
+
+    @staticmethod
+    def write(message: str, level: str = "info") -> None:
+        """Record an event without waiting on terminal or file"""
+        record = Record(datetime.now(), level, message)
+        with Log.appending:
+            Log.records.append(record)
+            Log.pending.append(record)
+        Log.changed.set()
+        if Log.thread is None:
+            Log.start()
+
+    @staticmethod
+    def debug(message: str) -> None:
+        Log.write(message, "debug")
+
+    @staticmethod
+    def info(message: str) -> None:
+        Log.write(message, "info")
+
+    @staticmethod
+    def warning(message: str) -> None:
+        Log.write(message, "warning")
+
+    @staticmethod
+    def error(message: str) -> None:
+        Log.write(message, "error")
+
+    @staticmethod
+    def start() -> None:
+        with Log.starting:
+            if Log.thread is None:
+                Log.thread = threading.Thread(target=Log.run, daemon=True)
+                Log.thread.start()
+
+    @staticmethod
+    def run() -> None:
+        """Renderer: wait for new records, flush them, then rest before the next"""
+        while True:
+            Log.changed.wait()
+            Log.changed.clear()
+            config = Config.load("log")
+            try:
+                Log.flush(config)
+            except Exception as e:  # The renderer must outlive a failed redraw
+                print(f"Log renderer failed: {e}", file=shutil.sys.stderr)
+            time.sleep(1 / config["redraw_hz"])
+
+    @staticmethod
+    def flush(config: dict = None) -> None:
+        """Write pending records to the log file and the terminal"""
+        config = config or Config.load("log")
+        with Log.lock:
+            with Log.appending:
+                records = list(Log.pending)
+                Log.pending.clear()
+            if not records:
+                return None
+            if config["file"]:
+                try:
+                    with open(shutil.os.path.expanduser(config["file"]), "a") as f:
+                        f.writelines(Log.format(record) + "\n" for record in records)
+                except OSError:
+                    pass
+            if shutil.sys.stdout.isatty():
+                Log.draw(config)
+            else:
+                for record in Log.shown(records, config):
+                    print(Log.format(record), flush=True)
+
+    @staticmethod
+    def format(record: Record) -> str:
+        return f"{record.at:%Y-%m-%d %H:%M:%S} {record.level:<7} {record.message}"
+
+    @staticmethod
+    def shown(records, config: dict) -> list[Record]:
+        """Records at or above the configured level"""
+        least = Log.levels.get(config["level"], 20)
+        return [r for r in records if Log.levels.get(r.level, 20) >= least]
+
+    @staticmethod
+    def draw(config: dict) -> None:
         """
         Reprints terminal screen with most recent event messages
 
         Re-centers logo and change list length based on terminal size
         """
-        shutil.os.system("clear")
         t = shutil.get_terminal_size()
         logo = "\n".join(
             line.center(t.columns)
@@ -53,9 +317,167 @@ class App:
             """.splitlines()
         )
         divide = ("─" * round(t.columns / 1.5)).center(t.columns) + "\n"
-        print(logo, App.url.center(t.columns), sep="\n", end=divide)
-        (m := App.messages).append(message)
-        print(*[f" > {msg}" for msg in m[-min(len(m), (t.lines - 12)) :]], sep="\n")
+        with Log.appending:
+            records = list(Log.records)
+        lines = [
+            f" > {r.message}" if r.level == "info" else f" > {r.level}: {r.message}"
+            for r in Log.shown(records, config)[-max(t.lines - 12, 1) :]
+        ]
+        screen = "\n".join([logo, App.url.center(t.columns) + divide, *lines])
+        clear = "\033[H\033[2J"  # Escape codes rather than spawning `clear`
+        shutil.sys.stdout.write(clear + screen + "\n")
+        shutil.sys.stdout.flush()
+
+
+class Metrics:
+    """
+    Counters and latency histograms of page requests, Helix calls, SQLite
+    statements and template rendering, exposed in Prometheus text format at
+    `/metrics` and summarized on the settings page
+    """
+
+    lock = threading.Lock()
+    buckets = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    kinds = {  # name -> (type, help)
+        "http_request_seconds": ("histogram", "Time to answer a request by route"),
+        "helix_request_seconds": ("histogram", "Helix round trips by endpoint"),
+        "helix_call_seconds": ("histogram", "Helix.get and get_iter by endpoint"),
+        "fanout_seconds": ("histogram", "Concurrent batches of Helix requests"),
+        "db_query_seconds": ("histogram", "SQLite statements by kind"),
+        "template_seconds": ("histogram", "Template rendering by template"),
+        "helix_responses_total": ("counter", "Helix responses by status code"),
+        "cache_requests_total": ("counter", "Data cache lookups by cache and result"),
+        "image_cache_requests_total": ("counter", "Image lookups by result"),
+        "prefetches_total": ("counter", "Speculative snapshot refreshes by outcome"),
+        "image_cache_evictions_total": ("counter", "Images evicted over budget"),
+        "ratelimit_remaining": ("gauge", "Helix rate-limit points left"),
+        "ratelimit_limit": ("gauge", "Helix rate-limit points per bucket"),
+    }
+    counters: dict[tuple, float] = {}  # (name, labels) -> value
+    histograms: dict[tuple, list] = {}  # (name, labels) -> [*bucket counts, sum]
+
+    @staticmethod
+    def inc(name: str, value: float = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with Metrics.lock:
+            Metrics.counters[key] = Metrics.counters.get(key, 0) + value
+
+    @staticmethod
+    def observe(name: str, seconds: float, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        i = bisect.bisect_left(Metrics.buckets, seconds)
+        with Metrics.lock:
+            if (h := Metrics.histograms.get(key)) is None:
+                h = Metrics.histograms[key] = [0] * (len(Metrics.buckets) + 1) + [0.0]
+            h[i] += 1
+            h[-1] += seconds
+
+    @staticmethod
+    @contextlib.contextmanager
+    def timed(name: str, **labels):
+        """Observe the time spent in the `with` block, even if it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            Metrics.observe(name, time.perf_counter() - start, **labels)
+
+    @staticmethod
+    def plugin(callback):
+        """Bottle plugin timing every route"""
+
+        @functools.wraps(callback)
+        def wrapper(*args, **kwargs):
+            with Metrics.timed("http_request_seconds", route=bt.request.route.rule):
+                return callback(*args, **kwargs)
+
+        return wrapper
+
+    @staticmethod
+    def templates(template):
+        """Wrap `bt.template` to time rendering by template name"""
+
+        @functools.wraps(template)
+        def wrapper(name, *args, **kwargs):
+            with Metrics.timed("template_seconds", template=name):
+                return template(name, *args, **kwargs)
+
+        return wrapper
+
+    @staticmethod
+    def collect() -> tuple[dict, dict]:
+        """Copies of counters (with image cache and rate-limit state) and histograms"""
+        with Metrics.lock:
+            counters = dict(Metrics.counters)
+            histograms = {key: list(h) for key, h in Metrics.histograms.items()}
+        for stat, result in [("hits", "hit"), ("misses", "miss")]:
+            key = ("image_cache_requests_total", (("result", result),))
+            counters[key] = Images.stats[stat]
+        counters[("image_cache_evictions_total", ())] = Images.stats["evictions"]
+        counters[("ratelimit_remaining", ())] = RateLimit.remaining
+        counters[("ratelimit_limit", ())] = RateLimit.limit
+        return counters, histograms
+
+    @staticmethod
+    def labels(labels: tuple, **extra) -> str:
+        pairs = [*labels, *extra.items()]
+        if not pairs:
+            return ""
+        escape = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"')
+        return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in pairs) + "}"
+
+    @staticmethod
+    def render() -> str:
+        """All metrics in the Prometheus text exposition format"""
+        counters, histograms = Metrics.collect()
+        lines = []
+        for name, (kind, text) in Metrics.kinds.items():
+            lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{name}{Metrics.labels(labels)} {value}")
+            for (n, labels), h in sorted(histograms.items()):
+                if n != name:
+                    continue
+                count = 0
+                for bound, observed in zip([*Metrics.buckets, "+Inf"], h[:-1]):
+                    count += observed
+                    le = Metrics.labels(labels, le=bound)
+                    lines.append(f"{name}_bucket{le} {count}")
+                lines.append(f"{name}_sum{Metrics.labels(labels)} {h[-1]}")
+                lines.append(f"{name}_count{Metrics.labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def summary() -> dict:
+        """Totals for the settings page: counts and mean times, hit ratios, budget"""
+        counters, histograms = Metrics.collect()
+        totals = {}  # histogram name -> [count, sum]
+        for (name, _), h in histograms.items():
+            total = totals.setdefault(name, [0, 0.0])
+            total[0] += sum(h[:-1])
+            total[1] += h[-1]
+        summary = {
+            name.replace("_seconds", ""): f"{n} ({1000 * t / n:.1f} ms mean)"
+            for name, (n, t) in sorted(totals.items())
+            if n
+        }
+        hits = {}  # cache -> [hits, lookups]
+        for (name, labels), value in counters.items():
+            if name in ["cache_requests_total", "image_cache_requests_total"]:
+                labels = dict(labels)
+                cache = labels.get("cache", "images")
+                ratio = hits.setdefault(cache, [0, 0])
+                ratio[0] += value if labels["result"] != "miss" else 0
+                ratio[1] += value
+        for cache, (hit, total) in sorted(hits.items()):
+            summary[f"{cache} hit ratio"] = f"{hit / total:.0%}" if total else "-"
+        summary["rate limit"] = f"{RateLimit.remaining}/{RateLimit.limit} points"
+        return summary
+
+
+bt.install(Metrics.plugin)
+bt.template = Metrics.templates(bt.template)
 
 
 @bt.hook("before_request")
@@ -63,7 +485,9 @@ def _connect_db() -> None:
     """
     The following is run at the start of each page request (user action on webpage)
     """
-    db.connect()
+    if bt.request.path.startswith(("/cache/", "/static/", "/thumb/", "/metrics")):
+        return  # Files and metrics are served without touching data.db
+    db.connect(reuse_if_open=True)
     if not any(
         path in bt.request.path
         for path in ["authenticate", "config", "settings", "error"]
@@ -110,12 +534,12 @@ class Streamer(BaseModel):
     """
 
     id = pw.IntegerField(primary_key=True)
-    login = pw.TextField()
-    display_name = pw.TextField()
+    login = pw.TextField(index=True)
+    display_name = pw.TextField(index=True)
     broadcaster_type = pw.TextField(default="user")  # If not partner/affiliate
     description = pw.TextField(default="Twitch streamer")  # Default if no description
     profile_image_url = pw.TextField()
-    followed = pw.BooleanField(default=False)
+    followed = pw.BooleanField(default=False, index=True)
 
 
 class Game(BaseModel):
@@ -129,6 +553,379 @@ class Game(BaseModel):
     box_art_url = pw.TextField()
 
 
+class SearchIndex(FTS5Model):
+    """
+    Base class for the full-text search tables. Each row shares its rowid
+    with the id of the cached row it indexes
+    """
+
+    rowid = RowIDField()
+
+    class Meta:
+        database = db
+        options = {"tokenize": "unicode61 remove_diacritics 2", "prefix": "2 3"}
+
+
+class StreamerIndex(SearchIndex):
+    """Full-text index of cached streamers' names and descriptions"""
+
+    login = SearchField()
+    display_name = SearchField()
+    description = SearchField()
+
+
+class GameIndex(SearchIndex):
+    """Full-text index of cached game names"""
+
+    name = SearchField()
+
+
+class Session:
+    """
+    Long-lived http clients shared across page requests. Connections to the
+    Helix API and the image CDN are pooled per host and kept alive, so only
+    the first request to each host pays for the TCP/TLS handshake.
+
+    Coroutines all run on one event loop living in its own thread for the
+    lifetime of the app, so the async client and other loop-bound resources
+    are shared across requests. Server threads hand coroutines to it with
+    `Session.run` (wait for the result) or `Session.submit` (don't)
+    """
+
+    lock = threading.Lock()
+    client: httpx.Client = None
+    aclient: httpx.AsyncClient = None
+    loop: asyncio.AbstractEventLoop = None
+
+    @staticmethod
+    def options() -> dict:
+        """Client pool limits, timeouts and protocol from the `network` settings"""
+        c = Config.load("network")
+        return {
+            # HTTP/2 needs the optional `h2` package (httpx[http2])
+            "http2": c["http2"] and importlib.util.find_spec("h2") is not None,
+            "limits": httpx.Limits(
+                max_connections=c["max_connections"],
+                max_keepalive_connections=c["max_keepalive_connections"],
+                keepalive_expiry=c["keepalive_expiry"],
+            ),
+            "timeout": httpx.Timeout(c["timeout"], connect=c["connect_timeout"]),
+        }
+
+    @staticmethod
+    def sync() -> httpx.Client:
+        """Shared blocking client, safe to use from any server thread"""
+        if Session.client is None:
+            with Session.lock:
+                if Session.client is None:
+                    Session.client = httpx.Client(**Session.options())
+        return Session.client
+
+    @staticmethod
+    def aio() -> httpx.AsyncClient:
+        """Shared async client, for use by coroutines on the app's event loop"""
+        if Session.aclient is None:
+            Session.aclient = httpx.AsyncClient(**Session.options())
+        return Session.aclient
+
+    @staticmethod
+    def start() -> asyncio.AbstractEventLoop:
+        """The app's event loop, started in a daemon thread on first use"""
+        if Session.loop is None:
+            with Session.lock:
+                if Session.loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(
+                        target=loop.run_forever, name="event-loop", daemon=True
+                    ).start()
+                    Session.loop = loop
+        return Session.loop
+
+    @staticmethod
+    def run(coro):
+        """
+        Run coroutine on the app's event loop and block until it finishes.
+        Must not be called from the loop itself. Helix failures abort with
+        502, as they do for `Helix.get`
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, Session.start())
+        try:
+            return future.result()
+        except httpx.HTTPError as e:
+            Log.error(f"Error in handling concurrent Helix requests. Error: {e}")
+            bt.abort(code=502, text="Error in handling requests to Helix")
+
+    @staticmethod
+    async def offload(fn, *args):
+        """
+        Run blocking database work in a worker thread, so a slow write does not
+        hold up the Helix requests queued on the event loop
+        """
+
+        def work():
+            with db.connection_context():
+                return fn(*args)
+
+        return await asyncio.get_running_loop().run_in_executor(None, work)
+
+    @staticmethod
+    def submit(coro) -> None:
+        """Schedule coroutine on the app's event loop without waiting for it"""
+
+        def done(future: Future) -> None:
+            if not future.cancelled() and (e := future.exception()) is not None:
+                Log.error(f"Background task failed: {e}")
+
+        asyncio.run_coroutine_threadsafe(coro, Session.start()).add_done_callback(done)
+
+    @staticmethod
+    def close() -> None:
+        """Close pooled connections and stop the event loop on server shutdown"""
+        with Session.lock:
+            if Session.client is not None:
+                Session.client.close()
+                Session.client = None
+        if Session.loop is not None:
+            if Session.aclient is not None:
+                Session.run(Session.aclient.aclose())
+                Session.aclient = None
+            Session.loop.call_soon_threadsafe(Session.loop.stop)
+            Session.loop = None
+
+
+class State(BaseModel):
+    """
+    Key/value store for application bookkeeping, such as the time the
+    followed set was last synchronized with Helix
+    """
+
+    key = pw.TextField(primary_key=True)
+    value = pw.TextField()
+
+    @staticmethod
+    def read(key: str, default: str = None) -> str:
+        row = State.get_or_none(State.key == key)
+        return default if row is None else row.value
+
+    @staticmethod
+    def write(key: str, value: str) -> None:
+        State.replace(key=key, value=value).execute()
+
+
+class Flight:
+    """
+    Coalesces identical work started concurrently from different server
+    threads: the first caller of a key does the work and later callers wait
+    for it to finish and share its result (or exception)
+    """
+
+    lock = threading.Lock()
+    calls: dict[tuple, Future] = {}
+
+    @staticmethod
+    def do(key: tuple, fn, share: bool = False):
+        """
+        Result of `fn`, or of a call with the same key already in flight.
+        Waiting callers get a deep copy unless `share` is set, since results
+        are often modified in place by the caller. Copies are made from one
+        taken before the leader returns, never from the object it modifies
+        """
+        with Flight.lock:
+            leader = (future := Flight.calls.get(key)) is None
+            if leader:
+                future = Flight.calls[key] = Future()
+        if not leader:
+            result = future.result()
+            return result if share else copy.deepcopy(result)
+        try:
+            result = fn()
+            future.set_result(result if share else copy.deepcopy(result))
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with Flight.lock:
+                del Flight.calls[key]
+
+    @staticmethod
+    def shared(fn):
+        """Decorator coalescing concurrent calls of `fn` with the same arguments"""
+
+        @functools.wraps(fn)
+        def wrapper(*args):
+            return Flight.do((fn.__qualname__, *args), lambda: fn(*args))
+
+        return wrapper
+
+    @staticmethod
+    def claim(keys: list[tuple]) -> tuple[list[tuple], list[Future]]:
+        """
+        Take ownership of the keys nobody else is working on. Returns the
+        claimed keys and the futures of the keys already in flight elsewhere
+        """
+        claimed, pending = [], []
+        with Flight.lock:
+            for key in keys:
+                if (future := Flight.calls.get(key)) is None:
+                    Flight.calls[key] = Future()
+                    claimed.append(key)
+                else:
+                    pending.append(future)
+        return claimed, pending
+
+    @staticmethod
+    def release(keys: list[tuple], error: BaseException = None) -> None:
+        """Finish work on claimed keys, waking anyone waiting on them"""
+        with Flight.lock:
+            futures = [Flight.calls.pop(key) for key in keys]
+        for future in futures:
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+
+class RateLimit:
+    """
+    Scheduler shared by every Helix request. Tracks the token bucket reported
+    in Twitch's `Ratelimit-*` response headers and holds requests back when
+    the bucket runs low, caps the number of requests in flight, and retries
+    429 and 5xx responses with jittered exponential backoff
+    """
+
+    lock = threading.Lock()
+    limit = 800  # Points per minute until Twitch reports otherwise
+    remaining = 800
+    reset = 0.0  # Epoch time at which the bucket is full again
+    slots: threading.BoundedSemaphore = None
+    queue: asyncio.Semaphore = None  # Coroutines let on to take a slot at once
+
+    @staticmethod
+    def take(c: dict) -> float:
+        """
+        Spend a point for a request about to be sent, or return how many
+        seconds to wait until the bucket refills
+        """
+        with RateLimit.lock:
+            now = time.time()
+            if now >= RateLimit.reset:
+                RateLimit.remaining = max(RateLimit.remaining, RateLimit.limit)
+            elif RateLimit.remaining <= c["reserve"]:
+                return RateLimit.reset - now
+            RateLimit.remaining -= 1
+            return 0
+
+    @staticmethod
+    def update(resp: httpx.Response) -> None:
+        """Adopt the bucket state reported by a Helix response"""
+        try:
+            limit = int(resp.headers["Ratelimit-Limit"])
+            remaining = int(resp.headers["Ratelimit-Remaining"])
+            reset = float(resp.headers["Ratelimit-Reset"])
+        except (KeyError, ValueError):
+            return
+        with RateLimit.lock:
+            RateLimit.limit, RateLimit.remaining = limit, remaining
+            RateLimit.reset = reset
+
+    @staticmethod
+    def retry_after(resp: httpx.Response, attempt: int, c: dict) -> float:
+        """Seconds to wait before retrying, or None if the request is done"""
+        if resp is not None and resp.status_code != 429 and resp.status_code < 500:
+            return None
+        if attempt == c["retries"]:
+            return None
+        wait = c["backoff"] * 2**attempt
+        if resp is not None and resp.status_code == 429:
+            wait = max(wait, RateLimit.reset - time.time())
+        return wait + random.uniform(0, c["backoff"])
+
+    @staticmethod
+    def semaphore(c: dict) -> threading.BoundedSemaphore:
+        with RateLimit.lock:
+            if RateLimit.slots is None:
+                RateLimit.slots = threading.BoundedSemaphore(c["max_in_flight"])
+            return RateLimit.slots
+
+    @staticmethod
+    async def aslot(c: dict) -> threading.BoundedSemaphore:
+        """
+        Take one of the slots server threads also use, from the event loop.
+        Coroutines line up on an asyncio semaphore of the same size, so at
+        most `max_in_flight` of them wait (off the loop) for slots held by
+        threads. The caller releases the returned slot
+        """
+        slots = RateLimit.semaphore(c)
+        if RateLimit.queue is None:
+            RateLimit.queue = asyncio.Semaphore(c["max_in_flight"])
+        async with RateLimit.queue:
+            if slots.acquire(blocking=False):
+                return slots
+            future = asyncio.get_running_loop().run_in_executor(None, slots.acquire)
+            try:
+                await asyncio.shield(future)
+            except asyncio.CancelledError:
+                future.add_done_callback(lambda _: slots.release())
+                raise
+            return slots
+
+    @staticmethod
+    def path(url: str) -> str:
+        """Endpoint of a Helix url, without query, as a metrics label"""
+        return url.split("?")[0].replace(f"{Helix.endpoint}/", "")
+
+    @staticmethod
+    def send(method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a Helix request from a server thread, raising on failure"""
+        c = Config.load("helix")
+        slots = RateLimit.semaphore(c)
+        path = RateLimit.path(url)
+        for attempt in range(c["retries"] + 1):
+            while (wait := RateLimit.take(c)) > 0:
+                time.sleep(wait)
+            resp = None
+            try:
+                with slots, Metrics.timed("helix_request_seconds", endpoint=path):
+                    resp = Session.sync().request(method, url, **kwargs)
+                RateLimit.update(resp)
+                Metrics.inc("helix_responses_total", code=resp.status_code)
+            except httpx.TransportError:
+                if attempt == c["retries"]:
+                    raise
+            if (wait := RateLimit.retry_after(resp, attempt, c)) is None:
+                break
+            time.sleep(wait)
+        resp.raise_for_status()
+        return resp
+
+    @staticmethod
+    async def asend(method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a Helix request from an event loop, raising on failure"""
+        c = Config.load("helix")
+        path = RateLimit.path(url)
+        for attempt in range(c["retries"] + 1):
+            while (wait := RateLimit.take(c)) > 0:
+                await asyncio.sleep(wait)
+            resp = None
+            slots = await RateLimit.aslot(c)
+            try:
+                with Metrics.timed("helix_request_seconds", endpoint=path):
+                    resp = await Session.aio().request(method, url, **kwargs)
+                RateLimit.update(resp)
+                Metrics.inc("helix_responses_total", code=resp.status_code)
+            except httpx.TransportError:
+                if attempt == c["retries"]:
+                    raise
+            finally:
+                slots.release()
+            if (wait := RateLimit.retry_after(resp, attempt, c)) is None:
+                break
+            await asyncio.sleep(wait)
+        resp.raise_for_status()
+        return resp
+
+
 class Helix:
     """
     Application information to interface with the Helix API
@@ -151,10 +948,11 @@ class Helix:
         """
         return {
             "Client-ID": Helix.client_id,
-            "Authorization": f"Bearer {User.get().access_token}",
+            "Authorization": f"Bearer {Db.user().access_token}",
         }
 
     @staticmethod
+    @Flight.shared
     def get(params: str) -> list[dict]:
         """
         Blueprint for http requests specifically for Helix API
@@ -172,18 +970,33 @@ class Helix:
         ```
         and the `data` key is selected, which is of type `list[dict]`
         """
+        endpoint = params.split("?")[0]
         try:
-            with httpx.Client(headers=Helix.headers(), timeout=None) as session:
-                resp: list[dict] = session.get(f"{Helix.endpoint}/{params}").json()[
-                    "data"
-                ]
+            with Metrics.timed("helix_call_seconds", call="get", endpoint=endpoint):
+                resp: list[dict] = RateLimit.send(
+                    "GET", f"{Helix.endpoint}/{params}", headers=Helix.headers()
+                ).json()["data"]
             return resp
         except httpx.HTTPError as e:
-            App.display(f"Error in handling request with params {params}. Error: {e}")
+            Log.error(f"Error in handling request with params {params}. Error: {e}")
             bt.abort(code=502, text=f"Error in handling request with params {params}")
 
     @staticmethod
+    @Flight.shared
     def get_iter(params: str) -> list[dict]:
+        """
+        Every result of a paginated Helix endpoint as one list.
+        See `Helix.pages` to consume results as they arrive
+        """
+        results = []
+        endpoint = params.split("?")[0]
+        with Metrics.timed("helix_call_seconds", call="get_iter", endpoint=endpoint):
+            for data, _ in Helix.pages(params):
+                results += data
+        return results
+
+    @staticmethod
+    def pages(params: str):
         """
         Blueprint for http requests specifically for Helix API
         Includes necessary client-id and user access token
@@ -200,38 +1013,42 @@ class Helix:
         }
         ```
 
-        The response's `data` field (of type `list[dict]`) is appended to `results`
-
-        The `pagination` cursor, if it exists, is used as a request parameter for a
-        subsequent request at the same endpoint to show the next series of results
+        Yields the response's `data` field (of type `list[dict]`) along with the
+        `pagination` cursor, or None on the last page
 
-        Iterates requests with new index of results until no more data is found
+        The cursor, if it exists, is used as a request parameter for a subsequent
+        request at the same endpoint to show the next series of results. Requests
+        are only sent as the caller asks for the next page
         """
-        results, data = [], []
-        with httpx.Client(headers=Helix.headers(), timeout=None) as session:
-            while True:
-                resp = session.get(f"{Helix.endpoint}/{params}").json()
-                try:
-                    data: list[dict] = resp["data"]
-                except httpx.HTTPError as e:
-                    App.display(f"Error with {resp}. Caused the error {e}")
-                    bt.abort(
-                        code=502, text=f"Error with request {Helix.endpoint}/{params}"
-                    )
-                if data == []:
-                    break
-                results += data
-                if resp["pagination"] == {}:
-                    return results
-                pagination = resp["pagination"]["cursor"]
-                if "after" in params:
-                    params = params[: (params.rfind("=") + 1)] + pagination
-                else:
-                    params = params + f"&after={pagination}"
-        return results
+        headers = Helix.headers()
+        while True:
+            try:
+                resp = RateLimit.send(
+                    "GET", f"{Helix.endpoint}/{params}", headers=headers
+                ).json()
+                data: list[dict] = resp["data"]
+            except httpx.HTTPError as e:
+                Log.error(f"Error with {params}. Caused the error {e}")
+                bt.abort(code=502, text=f"Error with request {Helix.endpoint}/{params}")
+            if data == []:
+                return
+            cursor = resp["pagination"].get("cursor")
+            yield data, cursor
+            if cursor is None:
+                return
+            params = Helix.after(params, cursor)
+
+    @staticmethod
+    def after(params: str, cursor: str) -> str:
+        """`params` moved to the page following `cursor`"""
+        if "after=" in params:
+            return params[: (params.rfind("=") + 1)] + cursor
+        return params + f"&after={cursor}"
 
 
 class Fetch:
+    vod_cache: dict[str, tuple[float, dict]] = {}  # Vod id -> (fetched at, data)
+
     @staticmethod
     def user(access_token: str) -> User:
         """
@@ -248,11 +1065,11 @@ class Fetch:
             "Authorization": f"Bearer {access_token}",
         }
         try:
-            user: dict = httpx.get(
-                f"{Helix.endpoint}/users", headers=headers, timeout=None
+            user: dict = RateLimit.send(
+                "GET", f"{Helix.endpoint}/users", headers=headers
             ).json()["data"][0]
         except Exception as e:
-            App.display(f"Error occurred: {e}")
+            Log.error(f"Error occurred: {e}")
             bt.abort(code=500, text="Error in fetching user data")
             shutil.sys.exit()
         user["access_token"] = access_token
@@ -278,11 +1095,14 @@ class Fetch:
         """
         tmp = list(ids)
         id_lists = [tmp[x : x + 100] for x in range(0, len(tmp), 100)]
-        async with httpx.AsyncClient(headers=Helix.headers(), timeout=None) as session:
+        headers = Helix.headers()
+        with Metrics.timed("fanout_seconds", fanout="live"):
             stream_list: list[httpx.Response] = await asyncio.gather(
                 *(
-                    session.get(
-                        f"{Helix.endpoint}/streams?{'&'.join([f'user_id={i}' for i in i_list])}"
+                    RateLimit.asend(
+                        "GET",
+                        f"{Helix.endpoint}/streams?{'&'.join([f'user_id={i}' for i in i_list])}",
+                        headers=headers,
                     )
                     for i_list in id_lists
                 )
@@ -308,126 +1128,683 @@ class Fetch:
                 tasks.append(Db.cache(ids, mode=args[1]))
             await asyncio.gather(*tasks)
 
-        asyncio.run(cache())
+        Session.run(cache())
+        channels = Db.lookup(Streamer, {int(stream["user_id"]) for stream in streams})
+        games = Db.lookup(
+            Game, {int(i) for stream in streams if (i := stream["game_id"])}
+        )
+        now = datetime.now(tz=timezone.utc)
         for stream in streams:
-            channel: Streamer = Streamer.get(int(stream["user_id"]))
-            try:
-                game = Game.get(int(stream["game_id"]))
+            channel: Streamer = channels[int(stream["user_id"])]
+            if (gid := stream["game_id"]) and (game := games.get(int(gid))):
                 stream["box_art_url"] = game.box_art_url
-            except ValueError:
+            else:
                 stream[
                     "box_art_url"
                 ] = "https://static-cdn.jtvnw.net/ttv-static/404_boxart.jpg"
             stream["profile_image_url"] = channel.profile_image_url
-            stream["uptime"] = time_elapsed(stream["started_at"])
-            stream["thumbnail_url"] = stream["thumbnail_url"].replace(
-                "-{width}x{height}", ""
+            stream["uptime"] = time_elapsed(stream["started_at"], now=now)
+            stream["thumbnail_url"] = Thumbs.register(
+                stream["user_id"],
+                stream["thumbnail_url"].replace("{width}x{height}", Thumbs.size),
             )
         streams.sort(key=lambda stream: stream["viewer_count"], reverse=True)
         return streams
 
-
-class Db:
-    key_defaults = ["broadcaster_type", "description", "offline_image_url"]
-
-    @staticmethod
-    def check_user() -> bt.redirect:
-        """
-        Check if User is logged in (table exists in data.db).
-        Redirect to authentication page if no user
-        """
-        if db.table_exists("user") is False or User.get_or_none() is None:
-            App.display("No user found. Please log in.")
-            return bt.redirect(Helix.oauth)
-
-    @staticmethod
-    def check_cache():
-        """Initial creation of database tables and caching if tables do not exist"""
-        if (Streamer.table_exists() and Game.table_exists()) is False:
-            db.create_tables([Streamer, Game])
-            App.display("Building cache")
-            follows = Fetch.follows(User.get().id)
-            asyncio.run(Db.cache(follows, "users"))
-            Streamer.update(followed=True).execute()
-
     @staticmethod
-    async def cache(ids: set[int], mode: str) -> None:
+    async def vods(ids: set[str]) -> dict[str, dict]:
         """
-        Caching mode: 'users' or 'games'.
-        If game/streamer id does not exist in database, send to caching.
-        https://api.twitch.tv/helix/<'games' or 'users'>?id=<id1>&id=<id2>...
+        Input: set of vod ids.
+        Vod data by id, from a short-lived cache or fetched in chunks of 100 ids.
+        Vods that no longer exist are missing from the result.
+        https://api.twitch.tv/helix/videos?id=<id1>&...&id=<id100>
         """
-
-        model = Streamer if mode == "users" else Game
-        tag = "box_art_url" if mode == "games" else "profile_image_url"
-
-        tmp = [i for i in ids if model.get_or_none(i) is None]
-        if not tmp:
-            return None
+        now, ttl = time.monotonic(), Config.load("snapshot")["vod_ttl"]
+        cache = Fetch.vod_cache
+        for vod_id in [i for i, (at, _) in cache.items() if now - at > ttl]:
+            del cache[vod_id]
+        tmp = [i for i in ids if i not in cache]
+        for result, n in [("hit", len(ids) - len(tmp)), ("miss", len(tmp))]:
+            Metrics.inc("cache_requests_total", n, cache="vods", result=result)
         id_lists = [tmp[x : x + 100] for x in range(0, len(tmp), 100)]
-
-        async with httpx.AsyncClient(headers=Helix.headers(), timeout=None) as session:
+        headers = Helix.headers()
+        with Metrics.timed("fanout_seconds", fanout="vods"):
             resps: list[httpx.Response] = await asyncio.gather(
                 *(
-                    session.get(
-                        f"{Helix.endpoint}/{mode}?{'&'.join([f'id={i}' for i in i_list])}"
+                    RateLimit.asend(
+                        "GET",
+                        f"{Helix.endpoint}/videos?{'&'.join([f'id={i}' for i in i_list])}",
+                        headers=headers,
                     )
                     for i_list in id_lists
                 )
             )
-
-        data = []
         for resp in resps:
-            datum: list[dict] = resp.json()["data"]
-            if datum:
-                data += datum
-        for datum in data:
-            if mode == "games":
-                datum["box_art_url"] = datum["box_art_url"].replace(
-                    "-{width}x{height}", "-285x380"
-                )
-            else:
-                for key in Db.key_defaults:
+            for vod in resp.json()["data"]:
+                cache[vod["id"]] = (now, vod)
+        return {i: cache[i][1] for i in ids if i in cache}
+
+    @staticmethod
+    def live_streams() -> list[dict]:
+        """Live streams of followed channels, ready for presenting"""
+        return Fetch.stream_info(Session.run(Fetch.live(Db.followed())))
+
+    @staticmethod
+    def top_streams() -> list[dict]:
+        """Top streams across the platform, ready for presenting"""
+        return Fetch.stream_info(Helix.get("streams?first=50"))
+
+    @staticmethod
+    def top_games() -> list[Game]:
+        """Top 100 categories by viewer count, in order"""
+        games = [int(g["id"]) for g in Helix.get("games/top?first=100")]
+        Session.run(Db.cache(set(games), mode="games"))
+        rank = {gid: i for i, gid in enumerate(games)}
+        data = list(Game.select().where(Game.id.in_(games)))
+        data.sort(key=lambda x: rank[x.id])
+        return data
+
+    @staticmethod
+    def category(game_id: int) -> list[dict]:
+        """Top streams of a category, ready for presenting"""
+        return Fetch.stream_info(Helix.get(f"streams?first=50&game_id={game_id}"))
+
+    @staticmethod
+    def channel_vods(channel: Streamer, after: str = None) -> tuple[list[dict], str]:
+        """One page of a channel's past broadcasts and the cursor of the next"""
+        params = f"videos?user_id={channel.id}&type=archive&first={App.vods_per_page}"
+        if after:
+            params = Helix.after(params, after)
+        vods, cursor = next(Helix.pages(params), ([], None))
+        return process_data(vods, "vod"), cursor
+
+    @staticmethod
+    def channel_clips(channel: Streamer, start: str, end: str) -> list[dict]:
+        """A channel's top clips created between two dates, most viewed first"""
+        start, end = f"{start}T00:00:00Z", f"{end}T00:00:00Z"
+        clips = Helix.get(
+            f"clips?broadcaster_id={channel.id}&first=100&started_at={start}&ended_at={end}"
+        )
+        data = process_data(clips, mode="clip")
+        return sorted(data, key=lambda info: info["view_count"], reverse=True)
+
+
+class Images:
+    """
+    Downloads avatars and box art into the cache directory in the background.
+    Downloads are bounded by the `images` settings, retried with backoff and
+    written to a temporary file before being moved into place.
+
+    Every cached image is tracked in `index.json` with its source url,
+    validators, size and last access. The cache is kept within `budget_mb` by
+    evicting the least recently used images, which are downloaded again when
+    next requested, as are files found truncated or missing
+    """
+
+    lock = threading.Lock()
+    path = f"{cachedir}/index.json"
+    modes = ["users", "games"]
+    index: dict[str, dict] = None  # "<mode>/<id>.jpg" -> url, etag, size, ...
+    stats = {"hits": 0, "misses": 0, "evictions": 0}
+    addressed = re.compile(r"-[0-9a-f]{12}\.jpg$")  # See `Images.name`
+    limit: asyncio.Semaphore = None  # Downloads in flight, across all requests
+    save_every = 5  # Seconds between writes of the index, at least
+    saved = 0.0  # When the index was last written
+    pending: threading.Timer = None  # Write of changes made since
+
+    @staticmethod
+    def entries() -> dict[str, dict]:
+        """Image index, loaded from disk (or rebuilt from the files) on first use"""
+        with Images.lock:
+            if Images.index is None:
+                try:
+                    with open(Images.path) as f:
+                        Images.index = json.load(f)
+                except (OSError, ValueError):
+                    Images.index = Images.scan()
+            return Images.index
+
+    @staticmethod
+    def scan() -> dict[str, dict]:
+        """
+        Index files cached before the index existed. Their source is unknown,
+        so they are never evicted
+        """
+        index = {}
+        for mode in Images.modes:
+            shutil.os.makedirs(f"{cachedir}/{mode}", exist_ok=True)
+            with shutil.os.scandir(f"{cachedir}/{mode}") as files:
+                for file in files:
+                    if file.name.endswith(".jpg"):
+                        stat = file.stat()
+                        index[f"{mode}/{file.name}"] = {
+                            "size": stat.st_size,
+                            "accessed": stat.st_mtime,
+                        }
+        return index
+
+    @staticmethod
+    def save() -> None:
+        """Write the image index to disk atomically"""
+        index = Images.entries()
+        with Images.lock:
+            data = json.dumps(index)
+        write_file(Images.path, data.encode())
+
+    @staticmethod
+    def changed() -> None:
+        """Save the index soon, once per `save_every` seconds however often called"""
+        with Images.lock:
+            if Images.pending is not None:
+                return
+            wait = Images.saved + Images.save_every - time.monotonic()
+            Images.pending = threading.Timer(max(wait, 0), Images.flush)
+            Images.pending.daemon = True
+            Images.pending.start()
+
+    @staticmethod
+    def flush() -> None:
+        """Write the index, as scheduled by `Images.changed`"""
+        with Images.lock:
+            Images.pending = None
+            Images.saved = time.monotonic()
+        Images.save()
+
+    @staticmethod
+    def store(name: str, resp: httpx.Response) -> None:
+        """Write a downloaded image and record it in the index"""
+        write_file(f"{cachedir}/{name}", resp.content)
+        index = Images.entries()
+        with Images.lock:
+            index.setdefault(name, {}).update(
+                etag=resp.headers.get("ETag"),
+                modified=resp.headers.get("Last-Modified"),
+                size=len(resp.content),
+                digest=hashlib.sha1(resp.content).hexdigest(),
+                accessed=time.time(),
+            )
+
+    @staticmethod
+    def name(mode: str, image: Image) -> str:
+        """
+        Cache path of an image. Twitch image urls change whenever the image
+        does, so naming files after the url makes them content-addressed
+        """
+        digest = hashlib.sha1(image.url.encode()).hexdigest()[:12]
+        return f"{mode}/{image.id}-{digest}.jpg"
+
+    @staticmethod
+    def headers(filename: str) -> tuple[str, dict]:
+        """Strong ETag and Cache-Control header for serving a cached image"""
+        with Images.lock:
+            digest = (Images.index or {}).get(filename, {}).get("digest")
+        if Images.addressed.search(filename):
+            cache_control = "public, max-age=31536000, immutable"
+        else:
+            cache_control = "public, max-age=86400"  # Named before urls were
+        return f'"{digest}"' if digest else None, {"Cache-Control": cache_control}
+
+    @staticmethod
+    def source(filename: str) -> str:
+        """Original url of a cached image"""
+        return Images.entries().get(filename, {}).get("url")
+
+    @staticmethod
+    def ensure(filename: str) -> bool:
+        """
+        Whether `filename` is in the cache intact, downloading it again first
+        if it was evicted or its size no longer matches the index
+        """
+        index = Images.entries()
+        try:
+            size = shutil.os.path.getsize(f"{cachedir}/{filename}")
+        except OSError:
+            size = None
+        with Images.lock:
+            entry = index.get(filename)
+            if entry is None:
+                return size is not None  # Not an image the cache manages
+            if size and size == entry.get("size"):
+                entry["accessed"] = time.time()
+                Images.stats["hits"] += 1
+                return True
+            Images.stats["misses"] += 1
+            url = entry.get("url")
+        if url is None:
+            return False
+
+        def download() -> None:
+            try:
+                resp = Session.sync().get(url)
+                resp.raise_for_status()
+            except httpx.HTTPError as e:
+                Log.warning(f"Could not download {url}: {e}")
+                return None
+            Images.store(filename, resp)
+            Images.evict()
+
+        # Waits instead if `Images.fetch` is downloading the same image
+        Flight.do(("image", filename), download, share=True)
+        return shutil.os.path.exists(f"{cachedir}/{filename}")
+
+    @staticmethod
+    def queue(images: list[Image], mode: str) -> None:
+        """
+        Record where each image comes from, then download them without
+        blocking the caller. Until a file arrives `/cache` fetches it on demand
+        """
+        if not images:
+            return
+        index = Images.entries()
+        with Images.lock:
+            for image in images:
+                entry = index.setdefault(Images.name(mode, image), {})
+                if entry.get("url") != image.url:
+                    entry.clear()  # Validators belong to the previous url
+                    entry["url"] = image.url
+        Session.submit(Images.fetch(images, mode))
+
+    @staticmethod
+    async def fetch(images: list[Image], mode: str) -> None:
+        c = Config.load("images")
+        if Images.limit is None:
+            Images.limit = asyncio.Semaphore(c["concurrency"])
+        await asyncio.gather(*(Images.download(image, mode, c) for image in images))
+        Images.evict()
+
+    @staticmethod
+    async def download(image: Image, mode: str, c: dict) -> None:
+        """Fetch one image, unless a request is downloading it already"""
+        name = Images.name(mode, image)
+        claimed, pending = Flight.claim([("image", name)])
+        if pending:  # Already being downloaded for a request, see `ensure`
+            await asyncio.wrap_future(pending[0])
+            return
+        try:
+            await Images.revalidate(name, image, c)
+        finally:
+            Flight.release(claimed)
+
+    @staticmethod
+    async def revalidate(name: str, image: Image, c: dict) -> None:
+        """
+        Fetch one image, sending validators from the last download so an
+        unchanged image is answered with `304 Not Modified`
+        """
+        entry = Images.entries().get(name, {})
+        headers = {}
+        if shutil.os.path.exists(f"{cachedir}/{name}"):
+            if etag := entry.get("etag"):
+                headers["If-None-Match"] = etag
+            if modified := entry.get("modified"):
+                headers["If-Modified-Since"] = modified
+        for attempt in range(c["retries"] + 1):
+            try:
+                async with Images.limit:
+                    resp = await Session.aio().get(image.url, headers=headers)
+                if resp.status_code == 304:
+                    return
+                resp.raise_for_status()
+                break
+            except httpx.HTTPError as e:
+                response = getattr(e, "response", None)
+                if attempt == c["retries"] or (
+                    response is not None and response.status_code < 500
+                ):
+                    Log.warning(f"Could not download {image.url}: {e}")
+                    return
+                await asyncio.sleep(c["backoff"] * 2**attempt)
+        Images.store(name, resp)
+
+    @staticmethod
+    def evict() -> None:
+        """
+        Delete least recently used images until the cache fits its budget,
+        keeping their urls so they can be downloaded again, then save the index
+        (debounced, see `Images.changed`)
+        """
+        budget = Config.load("images")["budget_mb"] * 2**20
+        index = Images.entries()
+        evicted = []
+        with Images.lock:
+            total = sum(entry.get("size", 0) for entry in index.values())
+            lru = sorted(
+                (entry.get("accessed", 0), name)
+                for name, entry in index.items()
+                if entry.get("size") and entry.get("url")
+            )
+            for _, name in lru:
+                if total <= budget:
+                    break
+                entry = index[name]
+                total -= entry.pop("size")
+                entry.pop("etag", None)
+                entry.pop("modified", None)
+                evicted.append(name)
+            Images.stats["evictions"] += len(evicted)
+        for name in evicted:
+            try:
+                shutil.os.remove(f"{cachedir}/{name}")
+            except FileNotFoundError:
+                pass
+        Images.changed()
+
+    @staticmethod
+    def summary() -> dict:
+        """Size of the cache against its budget, with hit/miss/eviction counts"""
+        index = Images.entries()
+        with Images.lock:
+            files = [entry["size"] for entry in index.values() if entry.get("size")]
+            return {
+                "images": len(files),
+                "size_mb": round(sum(files) / 2**20, 1),
+                "budget_mb": Config.load("images")["budget_mb"],
+                **Images.stats,
+            }
+
+    @staticmethod
+    def clear() -> None:
+        """Delete all cached images along with the index"""
+        with Images.lock:
+            Images.index = {}
+        for mode in Images.modes:
+            shutil.os.makedirs(f"{cachedir}/{mode}", exist_ok=True)
+            with shutil.os.scandir(f"{cachedir}/{mode}") as files:
+                for file in files:
+                    shutil.os.remove(file.path)
+        Images.save()
+
+
+class Thumbs:
+    """
+    Proxy for live, vod and clip thumbnails, fetched from the CDN at the size
+    cards render them. Each is fetched once per ttl, kept in memory (least
+    recently served dropped past `max_entries`) and served with matching
+    Cache-Control and ETag headers
+    """
+
+    size = "480x270"  # Width of `.thumbnail` in style.css
+    lock = threading.Lock()
+    sources: OrderedDict[str, str] = OrderedDict()  # Key -> url, see `register`
+    video = re.compile(r"(vod|clip)/([\w-]+)")  # Keys looked up again by id
+    entries: OrderedDict[str, tuple[float, bytes, str]] = OrderedDict()
+
+    @staticmethod
+    def register(key: str, url: str) -> str:
+        """
+        Remember the CDN url of thumbnail `key` ("<user id>", "vod/<id>" or
+        "clip/<id>"), returning its local path. Only the `max_sources` most
+        recently rendered are remembered, see `Thumbs.source` for the others
+        """
+        limit = Config.load("thumbs")["max_sources"]
+        with Thumbs.lock:
+            Thumbs.sources[key] = url
+            Thumbs.sources.move_to_end(key)
+            while len(Thumbs.sources) > limit:
+                Thumbs.sources.popitem(last=False)
+        return f"/thumb/{key}"
+
+    @staticmethod
+    def source(key: str) -> str:
+        """
+        CDN url of `key`. Once dropped from `Thumbs.sources`, a live thumbnail's
+        url is built from the channel's login and a vod's or clip's is looked
+        up on Helix again by id
+        """
+        with Thumbs.lock:
+            if url := Thumbs.sources.get(key):
+                return url
+        if key.isdigit() and (channel := Streamer.get_or_none(Streamer.id == key)):
+            return (
+                "https://static-cdn.jtvnw.net/previews-ttv/"
+                f"live_user_{channel.login}-{Thumbs.size}.jpg"
+            )
+        if match := Thumbs.video.fullmatch(key):
+            mode, video_id = match.groups()
+            endpoint = "videos" if mode == "vod" else "clips"
+            for data in Helix.get(f"{endpoint}?id={video_id}"):
+                if url := data.get("thumbnail_url"):
+                    url = url.replace("%{width}x%{height}", Thumbs.size)
+                    Thumbs.register(key, url)
+                    return url
+
+    @staticmethod
+    def ttl(key: str) -> int:
+        c = Config.load("thumbs")
+        return c["live_ttl"] if key.isdigit() else c["ttl"]
+
+    @staticmethod
+    def get(key: str) -> tuple[float, bytes, str]:
+        """(fetched at, image, etag) of `key`, fetched if missing or expired"""
+        with Thumbs.lock:
+            entry = Thumbs.entries.get(key)
+            if entry is not None:
+                Thumbs.entries.move_to_end(key)
+        if entry is not None and time.time() - entry[0] < Thumbs.ttl(key):
+            return entry
+        return Flight.do(("thumb", key), lambda: Thumbs.fetch(key), share=True)
+
+    @staticmethod
+    def fetch(key: str) -> tuple[float, bytes, str]:
+        if (url := Thumbs.source(key)) is None:
+            return None
+        resp = Session.sync().get(url)
+        resp.raise_for_status()
+        etag = f'"{hashlib.sha1(resp.content).hexdigest()[:16]}"'
+        entry = (time.time(), resp.content, etag)
+        with Thumbs.lock:
+            Thumbs.entries[key] = entry
+            Thumbs.entries.move_to_end(key)
+            while len(Thumbs.entries) > Config.load("thumbs")["max_entries"]:
+                Thumbs.entries.popitem(last=False)
+        return entry
+
+
+class Db:
+    key_defaults = ["broadcaster_type", "description", "offline_image_url"]
+    local_fields = {"followed"}  # Never overwritten by refreshed Helix data
+    memo = {"user": None, "tables": False}  # Bootstrap checks already passed
+
+    @staticmethod
+    def check_user() -> bt.redirect:
+        """
+        Check if User is logged in (table exists in data.db).
+        Redirect to authentication page if no user
+        """
+        if Db.memo["user"] is not None:
+            return None
+        if db.table_exists("user") is False or (user := User.get_or_none()) is None:
+            Log.info("No user found. Please log in.")
+            return bt.redirect(Helix.oauth)
+        Db.memo["user"] = user
+
+    @staticmethod
+    def user() -> User:
+        """Logged in user, read from data.db once per login"""
+        if Db.memo["user"] is None:
+            Db.memo["user"] = User.get()
+        return Db.memo["user"]
+
+    @staticmethod
+    def forget() -> None:
+        """Drop memoized bootstrap state after login, logout or cache clear"""
+        Db.memo.update(user=None, tables=False)
+
+    @staticmethod
+    def check_cache():
+        """
+        Initial creation of database tables. If they did not exist, the cache
+        is built from the user's follows in the background (see `Build`)
+        """
+        if Db.memo["tables"]:
+            return None
+        build = (Streamer.table_exists() and Game.table_exists()) is False
+        unindexed = not build and StreamerIndex.table_exists() is False
+        # Also adds tables and indexes missing from a data.db made by older versions
+        db.create_tables([Streamer, Game, State, StreamerIndex, GameIndex])
+        if unindexed:
+            Search.rebuild()
+        if build:
+            State.write("build_started_at", datetime.now(tz=timezone.utc).isoformat())
+        Db.memo["tables"] = True
+        Build.start()  # Also resumes a build interrupted by a crash or exit
+
+    @staticmethod
+    async def cache(ids: set[int], mode: str) -> None:
+        """
+        Caching mode: 'users' or 'games'.
+        If game/streamer id does not exist in database, send to caching.
+        https://api.twitch.tv/helix/<'games' or 'users'>?id=<id1>&id=<id2>...
+
+        Ids another request is already caching are waited on rather than
+        fetched and inserted a second time
+        """
+
+        model = Streamer if mode == "users" else Game
+
+        def select() -> set[int]:
+            cached = set()
+            for batch in pw.chunked(ids, 500):
+                query = model.select(model.id).where(model.id.in_(batch))
+                cached.update(i for (i,) in query.tuples())
+            return cached
+
+        cached = await Session.offload(select)
+        for result, n in [("hit", len(cached)), ("miss", len(ids) - len(cached))]:
+            Metrics.inc("cache_requests_total", n, cache=mode, result=result)
+        # Ids already being cached by another request are waited on, not refetched
+        claimed, pending = Flight.claim([(mode, i) for i in ids if i not in cached])
+        try:
+            await Db.fill([i for _, i in claimed], mode, model)
+        except BaseException as e:
+            Flight.release(claimed, e)
+            raise
+        Flight.release(claimed)
+        await asyncio.gather(*(asyncio.wrap_future(future) for future in pending))
+
+    @staticmethod
+    async def fill(tmp: list[int], mode: str, model: BaseModel) -> None:
+        """Fetch and store data and images of ids missing from the database"""
+        tag = "box_art_url" if mode == "games" else "profile_image_url"
+        if not tmp:
+            return None
+        id_lists = [tmp[x : x + 100] for x in range(0, len(tmp), 100)]
+
+        headers = Helix.headers()
+        with Metrics.timed("fanout_seconds", fanout=mode):
+            resps: list[httpx.Response] = await asyncio.gather(
+                *(
+                    RateLimit.asend(
+                        "GET",
+                        f"{Helix.endpoint}/{mode}?{'&'.join([f'id={i}' for i in i_list])}",
+                        headers=headers,
+                    )
+                    for i_list in id_lists
+                )
+            )
+
+        data = []
+        for resp in resps:
+            datum: list[dict] = resp.json()["data"]
+            if datum:
+                data += datum
+        for datum in data:
+            if mode == "games":
+                datum["box_art_url"] = datum["box_art_url"].replace(
+                    "-{width}x{height}", "-285x380"
+                )
+            else:
+                for key in Db.key_defaults:
                     if not datum[key]:  # Remove to replace with key's default
                         datum.pop(key)
 
         # `tag` key different for game datum and user datum
         images = [Image(datum["id"], datum[tag]) for datum in data]
 
-        def download_image(image: Image) -> None:
-            """Get image data from url, write to file with `mode` directory
-            and datum `id` as the filename"""
-            data = httpx.get(image.url).content
-            with open(f"{cachedir}/{mode}/{image.id}.jpg", "wb") as f:
-                f.write(data)
+        for datum, image in zip(data, images):
+            datum[tag] = f"/cache/{Images.name(mode, image)}"  # Point to file path
+            datum["id"] = int(datum["id"])
+        await Session.offload(Db.upsert, model, data)
+        Images.queue(images, mode)  # Rows are usable before images arrive
+
+    @staticmethod
+    def upsert(model: BaseModel, data: list[dict]) -> None:
+        """
+        Write rows of Helix data in chunked multi-row inserts within a single
+        transaction. Rows whose id already exists are updated in place, except
+        for columns only the app sets (`Db.local_fields`). Unused keys are discarded
+        """
+        fields = model._meta.sorted_fields
+        rows = [
+            {
+                f.name: datum[f.name] if f.name in datum else f.default
+                for f in fields
+                if f.name in datum or f.default is not None
+            }
+            for datum in data
+        ]
+        preserve = [
+            f for f in fields if not f.primary_key and f.name not in Db.local_fields
+        ]
+        with db.atomic():
+            for batch in pw.chunked(rows, 100):
+                model.insert_many(batch).on_conflict(
+                    conflict_target=[model._meta.primary_key], preserve=preserve
+                ).execute()
+            Search.index(model, rows)  # Kept in step with the rows it indexes
+
+    @staticmethod
+    def lookup(model: BaseModel, ids: set[int]) -> dict[int, BaseModel]:
+        """Rows of `model` by id, selected with one IN query per 500 ids"""
+        rows = {}
+        for batch in pw.chunked(ids, 500):
+            query = model.select().where(model.id.in_(batch))
+            rows.update((row.id, row) for row in query)
+        return rows
 
-        with ThreadPoolExecutor() as tp:
-            tp.map(download_image, images)
+    @staticmethod
+    def streamer(name: str) -> Streamer:
+        """Cached channel by login or display name, or abort with 404"""
+        try:
+            return Streamer.get(
+                (Streamer.display_name == name) | (Streamer.login == name)
+            )
+        except pw.DoesNotExist:
+            bt.abort(code=404, text="User does not exist")
 
-        for datum in data:
-            datum[tag] = f"/cache/{mode}/{datum['id']}.jpg"  # Point to file path
-            datum["id"] = int(datum["id"])
-            model.create(**datum)  # Discards unused keys
+    @staticmethod
+    def followed() -> set[int]:
+        """
+        Ids of followed channels as last synchronized into data.db, and while
+        the cache is being built, those of follows not cached yet
+        """
+        query = Streamer.select(Streamer.id).where(Streamer.followed == True)
+        return {sid for (sid,) in query.tuples()} | Build.follows
 
     @staticmethod
     def update_follows() -> set[int]:
         """
         Fetch user's current follows and cache
 
-        Toggle channel follow if follow in database and current do not match
+        Set `followed` of channels whose follow in database and current do not
+        match, except those toggled in the app too recently for Helix to reflect
         """
-        follows = Fetch.follows(User.get().id)
-        asyncio.run(Db.cache(follows, "users"))
-        streamers: list[Streamer] = [streamer for streamer in Streamer.select()]
-        to_toggle = set()
-        for streamer in streamers:
-            sid = streamer.id
-            if (sid in follows and streamer.followed is not True) or (
-                sid not in follows and streamer.followed is True
-            ):
-                to_toggle.add(streamer)
-        if to_toggle:
-            asyncio.run(Db.toggle_follow(to_toggle))
+        follows = Fetch.follows(Db.user().id)
+        Session.run(Db.cache(follows, "users"))
+        settled = time.monotonic() - Config.load("sync")["settle"]
+        recent = {sid for sid, at in Sync.toggled.copy().items() if at > settled}
+        current = Db.followed()
+        unfollow = list(current - follows - recent)
+        follow = list(follows - current - recent)
+        with db.atomic():
+            for value, ids in [(False, unfollow), (True, follow)]:
+                for batch in pw.chunked(ids, 500):
+                    Streamer.update(followed=value).where(
+                        Streamer.id.in_(batch)
+                    ).execute()
+            State.write("follows_synced_at", datetime.now(tz=timezone.utc).isoformat())
+        if unfollow or follow:
+            Snapshot.expire("live")
         return follows
 
     @staticmethod
@@ -435,31 +1812,779 @@ class Db:
         """Send http POST or DELETE based on value of follow after toggling"""
         url = f"{Helix.endpoint}/users/follows"
 
-        async def send(session: httpx.AsyncClient, data: dict, streamer: Streamer):
-            Streamer.update(followed=not streamer.followed).where(
-                Streamer.id == streamer.id
-            ).execute()
+        async def send(data: dict, streamer: Streamer):
+            Sync.toggled[streamer.id] = time.monotonic()
+            await Session.offload(
+                Streamer.update(followed=not streamer.followed)
+                .where(Streamer.id == streamer.id)
+                .execute
+            )
             if streamer.followed is True:
-                App.display(f"Unfollowing {streamer.display_name}")
-                await session.delete(url, params=data)
+                Log.info(f"Unfollowing {streamer.display_name}")
+                await RateLimit.asend("DELETE", url, params=data, headers=headers)
             else:
-                App.display(f"Following {streamer.display_name}")
-                await session.post(url, params=data)
+                Log.info(f"Following {streamer.display_name}")
+                await RateLimit.asend("POST", url, params=data, headers=headers)
 
-        async with httpx.AsyncClient(headers=Helix.headers(), timeout=None) as session:
-            tasks = []
-            for streamer in streamers:
-                data = {"to_id": str(streamer.id), "from_id": str(User.get().id)}
-                tasks.append(send(session, data, streamer))
-            await asyncio.gather(*tasks)
+        headers = Helix.headers()
+        tasks = []
+        for streamer in streamers:
+            data = {"to_id": str(streamer.id), "from_id": str(Db.user().id)}
+            tasks.append(send(data, streamer))
+        await asyncio.gather(*tasks)
+
+
+class Search:
+    """
+    Prefix search answered from data.db. Every streamer and game written by
+    `Db.upsert` is indexed, so cached channels and followed channels are found
+    without a request to Helix
+    """
+
+    indexes = {Streamer: StreamerIndex, Game: GameIndex}
+
+    @staticmethod
+    def index(model: BaseModel, rows: list[dict]) -> None:
+        """Add or replace the index rows of `model` rows being written"""
+        if (index := Search.indexes.get(model)) is None:
+            return None
+        fields = [f.name for f in index._meta.sorted_fields if f.name != "rowid"]
+        entries = [
+            {"rowid": row["id"], **{name: row.get(name, "") for name in fields}}
+            for row in rows
+        ]
+        for batch in pw.chunked(entries, 100):
+            index.insert_many(batch).on_conflict_replace().execute()
+
+    @staticmethod
+    def rebuild() -> None:
+        """Index every cached row, for a data.db made before the index existed"""
+        with db.atomic():
+            for model, index in Search.indexes.items():
+                fields = [f for f in index._meta.sorted_fields if f.name != "rowid"]
+                columns = [model._meta.fields[f.name] for f in fields]
+                index.delete().execute()
+                index.insert_from(
+                    model.select(model.id, *columns), [index.rowid, *fields]
+                ).execute()
+
+    @staticmethod
+    def expression(text: str) -> str:
+        """Match expression requiring a prefix match of every word in `text`"""
+        return " ".join(f'"{word}"*' for word in re.findall(r"\w+", text))
+
+    @staticmethod
+    def find(model: BaseModel, text: str, limit: int = None, followed=False):
+        """
+        Cached rows of `model` matching `text`, best match first.
+        Followed channels rank ahead of the rest, or are the only
+        results if `followed` is set
+        """
+        if not (expression := Search.expression(text)):
+            return []
+        index = Search.indexes[model]
+        query = model.select().join(index, on=(index.rowid == model.id))
+        query = query.where(index.match(expression))
+        if model is Streamer:
+            if followed:
+                query = query.where(Streamer.followed == True)
+            query = query.order_by(Streamer.followed.desc(), index.bm25())
+        else:
+            query = query.order_by(index.bm25())
+        return list(query.limit(limit))
+
+
+class Sync:
+    """
+    Background job keeping the followed set in data.db fresh, so page handlers
+    never walk the follow list themselves. Runs every `follows_interval`
+    seconds, or sooner when `Sync.request` is called
+    """
+
+    wake = threading.Event()
+    thread: threading.Thread = None
+    toggled: dict[int, float] = {}  # Streamer id -> time of last in-app toggle
+
+    @staticmethod
+    def start() -> None:
+        """Start the synchronizer thread if not already running"""
+        if Sync.thread is None or not Sync.thread.is_alive():
+            Sync.thread = threading.Thread(target=Sync.run, daemon=True)
+            Sync.thread.start()
+
+    @staticmethod
+    def request() -> None:
+        """Ask for a sync without waiting for the next interval"""
+        Sync.wake.set()
+
+    @staticmethod
+    def run() -> None:
+        while True:
+            try:
+                with db.connection_context():
+                    if (
+                        db.table_exists("user")
+                        and User.get_or_none() is not None
+                        and Streamer.table_exists()
+                        and not Build.unfinished()
+                    ):
+                        Db.update_follows()
+            except Exception as e:
+                Log.warning(f"Follow sync failed: {e}")
+            Sync.wake.wait(timeout=Config.load("sync")["follows_interval"])
+            Sync.wake.clear()
+
+    @staticmethod
+    def last() -> datetime:
+        """Time of the last completed sync, if any"""
+        if value := State.read("follows_synced_at"):
+            return datetime.fromisoformat(value)
+
+
+class Build:
+    """
+    Background job caching every followed channel after the first login.
+    Follows are cached and marked followed in steps of `build.step` ids, so
+    pages show partial data as it arrives. Progress is kept in `State`:
+    after a crash the job resumes from the saved follow list and skips the
+    ids already cached
+    """
+
+    thread: threading.Thread = None
+    follows: set[int] = set()  # Followed ids not cached yet, while building
+    progress = {"total": 0, "cached": 0, "started": 0.0, "resumed_with": 0}
+
+    @staticmethod
+    def unfinished() -> bool:
+        """Whether a build was started and has not completed"""
+        return (
+            State.table_exists()  # Not after the cache is cleared
+            and State.read("build_started_at") is not None
+            and State.read("build_finished_at") is None
+        )
+
+    @staticmethod
+    def start() -> None:
+        """Start (or resume) the build in a thread if one is unfinished"""
+        if Build.unfinished() and (Build.thread is None or not Build.thread.is_alive()):
+            Build.thread = threading.Thread(target=Build.run, daemon=True)
+            Build.thread.start()
+
+    @staticmethod
+    def running() -> bool:
+        return Build.thread is not None and Build.thread.is_alive()
+
+    @staticmethod
+    def run() -> None:
+        """Build until done, retrying failed steps after a pause"""
+        while True:
+            try:
+                with db.connection_context():
+                    if not Build.unfinished():
+                        return None
+                    Build.step()
+            except Exception as e:
+                Log.error(f"Building cache failed: {e}. Retrying...")
+                time.sleep(Config.load("build")["retry"])
+
+    @staticmethod
+    def step() -> None:
+        """Cache the remaining follows, one step at a time"""
+        if (saved := State.read("build_follows")) is None:
+            Log.info("Building cache: fetching follows")
+            follows = sorted(Fetch.follows(Db.user().id))
+            State.write("build_follows", json.dumps(follows))
+        else:
+            follows = json.loads(saved)
+        cached = set()
+        for batch in pw.chunked(follows, 500):
+            query = Streamer.select(Streamer.id).where(Streamer.id.in_(batch))
+            cached.update(i for (i,) in query.tuples())
+        Build.follows = set(follows) - cached
+        Build.progress.update(
+            total=len(follows),
+            cached=len(cached),
+            started=time.monotonic(),
+            resumed_with=len(cached),
+        )
+        Snapshot.expire("live")  # Live page can include follows from here on
+        Log.info(f"Building cache: {len(Build.follows)} of {len(follows)} channels")
+        for batch in pw.chunked(sorted(Build.follows), Config.load("build")["step"]):
+            Session.run(Db.cache(set(batch), "users"))
+            for ids in pw.chunked(batch, 500):
+                Streamer.update(followed=True).where(Streamer.id.in_(ids)).execute()
+            Build.follows -= set(batch)
+            Build.progress["cached"] += len(batch)
+        with db.atomic():
+            for ids in pw.chunked(cached, 500):  # Cached before the build began
+                Streamer.update(followed=True).where(Streamer.id.in_(ids)).execute()
+            now = datetime.now(tz=timezone.utc).isoformat()
+            State.write("build_finished_at", now)
+            State.write("follows_synced_at", now)
+            State.delete().where(State.key == "build_follows").execute()
+        Snapshot.expire("live")
+        Log.info("Building cache: done")
+
+    @staticmethod
+    def status() -> dict:
+        """Counts, rate and estimated seconds left of the build"""
+        if not Build.unfinished():
+            return {"state": "done"}
+        p = Build.progress
+        if not p["total"]:
+            return {"state": "fetching follows"}
+        elapsed = time.monotonic() - p["started"]
+        done = p["cached"] - p["resumed_with"]
+        rate = done / elapsed if elapsed and done else None
+        left = p["total"] - p["cached"]
+        return {
+            "state": "caching channels" if Build.running() else "paused",
+            "total": p["total"],
+            "cached": p["cached"],
+            "percent": round(100 * p["cached"] / p["total"]),
+            "per_second": round(rate, 1) if rate else None,
+            "eta_seconds": round(left / rate) if rate else None,
+        }
+
+
+class Player:
+    """
+    Launches and supervises player processes. Every process is tracked until
+    it exits and is reaped; with `multi = false` the running ones are stopped
+    before another is launched. With `player.prefetch` set, a background
+    thread resolves the playlist urls of the most watched followed live
+    streams with `streamlink --stream-url`, so those start without streamlink
+    """
+
+    lock = threading.Lock()
+    processes: dict[int, dict] = {}  # pid -> process, title and start time
+    resolved: dict[str, tuple[float, str]] = {}  # Login -> (resolved at, url)
+    thread: threading.Thread = None
+
+    @staticmethod
+    def launch(command: str, title: str) -> Popen:
+        """Start a player, first stopping the others unless `multi` is set"""
+        if not Config.load(os_)["multi"]:
+            Player.kill()
+        try:
+            p = Popen(lex(command), stdout=DEVNULL, stderr=DEVNULL)
+        except OSError as e:
+            Log.error(f"Could not launch player: {e}")
+            return None
+        with Player.lock:
+            Player.processes[p.pid] = {"process": p, "title": title, "at": time.time()}
+        Player.reap()
+        return p
+
+    @staticmethod
+    def watch(channel: str) -> Popen:
+        """Open a live stream, from its resolved url if there is a fresh one"""
+        c, p = Config.load(os_), Config.load("player")
+        at, url = Player.resolved.get(channel, (0, None))
+        if url and time.monotonic() - at < p["resolve_ttl"]:
+            Log.info(f"Launching stream twitch.tv/{channel} (resolved)")
+            command = f'{c["app"]} {c["args"]} --really-quiet "{url}"'
+        else:
+            Log.info(f"Launching stream twitch.tv/{channel}")
+            command = f'{p["streamlink"]} -l none -p {c["app"]} -a "{c["args"]}" \
+                --twitch-disable-ads --twitch-low-latency twitch.tv/{channel} best'
+        return Player.launch(command, f"twitch.tv/{channel}")
+
+    @staticmethod
+    def play(url: str) -> Popen:
+        """Open a vod or clip url in the player"""
+        c = Config.load(os_)
+        Log.info(f"Launching video: {url}")
+        return Player.launch(f'{c["app"]} {c["args"]} --really-quiet {url}', url)
+
+    @staticmethod
+    def reap() -> None:
+        """Forget processes that have exited, collecting their exit status"""
+        with Player.lock:
+            for pid, entry in list(Player.processes.items()):
+                if entry["process"].poll() is not None:
+                    del Player.processes[pid]
+
+    @staticmethod
+    def target(value: str) -> int:
+        """Pid named by a `kill=<pid|all>` query, None for all. 400 if neither"""
+        if value == "all":
+            return None
+        if not value.isdigit():
+            bt.abort(code=400, text=f"Not a player pid: {value}")
+        return int(value)
+
+    @staticmethod
+    def kill(pid: int = None) -> None:
+        """Stop player `pid`, or every player"""
+        with Player.lock:
+            targets = [
+                entry["process"]
+                for p, entry in Player.processes.items()
+                if pid is None or p == pid
+            ]
+        for process in targets:
+            process.terminate()
+            try:
+                process.wait(timeout=2)
+            except TimeoutExpired:
+                process.kill()
+                process.wait()
+        Player.reap()
+
+    @staticmethod
+    def list() -> list[dict]:
+        """Running players, oldest first"""
+        Player.reap()
+        with Player.lock:
+            return [
+                {"pid": pid, "title": entry["title"], "started": entry["at"]}
+                for pid, entry in sorted(
+                    Player.processes.items(), key=lambda item: item[1]["at"]
+                )
+            ]
+
+    @staticmethod
+    def resolve(channel: str) -> str:
+        """Playlist url of a live channel as resolved by streamlink, or None"""
+        streamlink = Config.load("player")["streamlink"]
+        command = f"{streamlink} --stream-url twitch.tv/{channel} best"
+        try:
+            process = Popen(lex(command), stdout=PIPE, stderr=DEVNULL, text=True)
+        except OSError:
+            return None
+        try:
+            out, _ = process.communicate(timeout=20)
+        except TimeoutExpired:
+            process.kill()
+            process.communicate()
+            return None
+        url = out.strip()
+        if process.returncode == 0 and url.startswith("http"):
+            Player.resolved[channel] = (time.monotonic(), url)
+            return url
+
+    @staticmethod
+    def start() -> None:
+        """Start the resolver thread if not already running"""
+        if Player.thread is None or not Player.thread.is_alive():
+            Player.thread = threading.Thread(target=Player.run, daemon=True)
+            Player.thread.start()
+
+    @staticmethod
+    def run() -> None:
+        """Keep the urls of the top `prefetch` followed live streams resolved"""
+        while True:
+            p = Config.load("player")
+            Player.reap()
+            with Snapshot.lock:
+                entry = Snapshot.entries.get("live")
+            streams = entry[1][: p["prefetch"]] if entry and p["prefetch"] else []
+            now = time.monotonic()
+            for stream in streams:  # Sorted by viewer count
+                at, _ = Player.resolved.get(stream["user_login"], (0, None))
+                if now - at > p["resolve_ttl"] / 2:
+                    Player.resolve(stream["user_login"])
+            live = {stream["user_login"] for stream in streams}
+            for channel in [c for c in Player.resolved.copy() if c not in live]:
+                Player.resolved.pop(channel, None)
+            time.sleep(max(p["resolve_ttl"] / 4, 5))
+
+
+class Snapshot:
+    """
+    In-process snapshots of page data with a time-to-live per page.
+    Stale snapshots are still served immediately while a background thread
+    refreshes them, so only the first visit to a page waits on Helix.
+    Snapshots of `Snapshot.pages` are also kept in the State table, so after
+    a restart they are served at once, marked stale, until refreshed. Those of
+    categories and channels are only kept in memory, the least recently used
+    dropped past `max_entries`
+    """
+
+    lock = threading.Lock()
+    entries: OrderedDict[str, tuple] = OrderedDict()  # Key -> (fetched at, data)
+    refreshing: set[str] = set()
+    loaded: set[str] = set()  # Keys already looked up in data.db
+    restored: dict[str, datetime] = {}  # Key -> fetch time, until refreshed
+    pages = {  # key -> (load, ttl)
+        "live": (Fetch.live_streams, "live_ttl"),
+        "top/channels": (Fetch.top_streams, "top_channels_ttl"),
+        "top/games": (Fetch.top_games, "top_games_ttl"),
+    }
+
+    @staticmethod
+    def page(key: str, force: bool = False):
+        """
+        Data of the page snapshotted under `key`: one of `Snapshot.pages`,
+        'categories/<game id>' or 'channels/<user id>/vods'
+        """
+        return Snapshot.get(key, *Snapshot.source(key), force)
+
+    @staticmethod
+    def source(key: str) -> tuple:
+        """Loader of the data snapshotted under `key` and the name of its ttl"""
+        if key.startswith("categories/"):
+            game_id = int(key.split("/")[1])
+            return (lambda: Fetch.category(game_id)), "category_ttl"
+        if key.startswith("channels/"):
+            user_id = int(key.split("/")[1])
+
+            def load():
+                return Fetch.channel_vods(Streamer.get_by_id(user_id))
+
+            return load, "channel_vods_ttl"
+        return Snapshot.pages[key]
+
+    @staticmethod
+    def fresh(key: str) -> bool:
+        """Whether a snapshot of `key` exists and is within its ttl"""
+        Snapshot.restore(key)
+        ttl = Config.load("snapshot")[Snapshot.source(key)[1]]
+        with Snapshot.lock:
+            entry = Snapshot.entries.get(key)
+        return entry is not None and time.monotonic() - entry[0] <= ttl
+
+    @staticmethod
+    def warm(key: str) -> bool:
+        """
+        Refresh the snapshot of `key` in the background unless it is already
+        being refreshed. Whether a refresh was started
+        """
+        with Snapshot.lock:
+            if key in Snapshot.refreshing:
+                return False
+            Snapshot.refreshing.add(key)
+        load = Snapshot.source(key)[0]
+        threading.Thread(
+            target=Snapshot.revalidate, args=(key, load), daemon=True
+        ).start()
+        return True
+
+    @staticmethod
+    def ready(key: str) -> bool:
+        """Whether a snapshot of `key`, fresh or stale, can be served at once"""
+        Snapshot.restore(key)
+        with Snapshot.lock:
+            return key in Snapshot.entries
+
+    @staticmethod
+    def get(key: str, load, ttl: str, force: bool = False):
+        """
+        Data for `key`, calling `load` if there is no snapshot or `force` is set.
+        `ttl` names the setting in the `snapshot` section that applies to `key`
+        """
+        Snapshot.restore(key)
+        with Snapshot.lock:
+            if (entry := Snapshot.entries.get(key)) is not None:
+                Snapshot.entries.move_to_end(key)
+        if entry is None or force:
+            Metrics.inc("cache_requests_total", cache="snapshot", result="miss")
+            return Snapshot.refresh(key, load)
+        fetched_at, data = entry
+        expired = time.monotonic() - fetched_at > Config.load("snapshot")[ttl]
+        result = "stale" if expired else "hit"
+        Metrics.inc("cache_requests_total", cache="snapshot", result=result)
+        if expired:
+            with Snapshot.lock:
+                stale = key not in Snapshot.refreshing
+                Snapshot.refreshing.add(key)
+            if stale:
+                threading.Thread(
+                    target=Snapshot.revalidate, args=(key, load), daemon=True
+                ).start()
+        return data
+
+    @staticmethod
+    def refresh(key: str, load):
+        """Replace snapshot of `key` with freshly loaded data"""
+        data = Flight.do(("snapshot", key), load, share=True)
+        limit = Config.load("snapshot")["max_entries"]
+        with Snapshot.lock:
+            Snapshot.entries[key] = (time.monotonic(), data)
+            Snapshot.entries.move_to_end(key)
+            Snapshot.restored.pop(key, None)
+            dynamic = [k for k in Snapshot.entries if k not in Snapshot.pages]
+            for old in dynamic[: max(len(dynamic) - limit, 0)]:
+                del Snapshot.entries[old]
+        if key in Snapshot.pages:
+            Snapshot.save(key, data)
+        return data
+
+    @staticmethod
+    def save(key: str, data: list) -> None:
+        """Keep snapshot of `key` in data.db with its fetch time"""
+        rows = [model_to_dict(row) if isinstance(row, Game) else row for row in data]
+        fetched_at = datetime.now(tz=timezone.utc).isoformat()
+        try:
+            State.write(f"snapshot/{key}", json.dumps({"at": fetched_at, "data": rows}))
+        except pw.OperationalError as e:  # Tables dropped by a logout meanwhile
+            Log.debug(f"Could not save snapshot of {key}: {e}")
+
+    @staticmethod
+    def restore(key: str) -> None:
+        """Load the snapshot of `key` kept in data.db, once per process"""
+        if key not in Snapshot.pages or key in Snapshot.loaded:
+            return None
+        Snapshot.loaded.add(key)
+        try:
+            saved = State.read(f"snapshot/{key}")
+        except pw.OperationalError:
+            return None
+        if saved is None:
+            return None
+        saved = json.loads(saved)
+        fetched_at = datetime.fromisoformat(saved["at"])
+        now = datetime.now(tz=timezone.utc)
+        data = saved["data"]
+        if key == "top/games":
+            data = [Game(**row) for row in data]
+        else:
+            for stream in data:
+                stream["uptime"] = time_elapsed(stream["started_at"], now=now)
+        age = (now - fetched_at).total_seconds()
+        with Snapshot.lock:
+            if key not in Snapshot.entries:
+                Snapshot.entries[key] = (time.monotonic() - age, data)
+                Snapshot.restored[key] = fetched_at
+        Metrics.inc("cache_requests_total", cache="snapshot", result="restored")
+
+    @staticmethod
+    def stale(key: str) -> datetime:
+        """Fetch time of `key` if it is served from data.db and not yet refreshed"""
+        with Snapshot.lock:
+            return Snapshot.restored.get(key)
+
+    @staticmethod
+    def revalidate(key: str, load) -> None:
+        """Background refresh of a stale snapshot"""
+        try:
+            with db.connection_context():
+                Snapshot.refresh(key, load)
+        except Exception as e:
+            Log.warning(f"Refreshing {key} failed: {e}")
+        finally:
+            with Snapshot.lock:
+                Snapshot.refreshing.discard(key)
+
+    @staticmethod
+    def expire(key: str) -> None:
+        """Mark snapshot of `key` stale so the next visit refreshes it"""
+        with Snapshot.lock:
+            if (entry := Snapshot.entries.get(key)) is not None:
+                Snapshot.entries[key] = (float("-inf"), entry[1])
+
+    @staticmethod
+    def clear() -> None:
+        with Snapshot.lock:
+            Snapshot.entries.clear()
+            Snapshot.restored.clear()
+            Snapshot.loaded.clear()
+
+
+class Prefetch:
+    """
+    Speculative refreshes of snapshots a click is likely to need next: the
+    streams of the top categories once `/top/games` is shown, and the page a
+    hovered link leads to (`/prefetch`). Results land in the snapshots the
+    routes read. Prefetches are skipped for fresh snapshots, limited to
+    `prefetch.per_minute` and held back while Helix's rate limit bucket is
+    down to `prefetch.spare` points, so they never delay real page loads
+    """
+
+    lock = threading.Lock()
+    started: deque[float] = deque()  # Start times within the last minute
+
+    @staticmethod
+    def allow() -> bool:
+        """Spend one prefetch of the budget, if any is left"""
+        c = Config.load("prefetch")
+        now = time.monotonic()
+        with Prefetch.lock:
+            while Prefetch.started and now - Prefetch.started[0] > 60:
+                Prefetch.started.popleft()
+            if len(Prefetch.started) >= c["per_minute"]:
+                return False
+            if RateLimit.remaining <= c["spare"] and time.time() < RateLimit.reset:
+                return False
+            Prefetch.started.append(now)
+            return True
+
+    @staticmethod
+    def warm(key: str) -> str:
+        """Prefetch snapshot of `key`. Outcome: fresh, started, pending or skipped"""
+        if Snapshot.fresh(key):
+            result = "fresh"
+        elif not Prefetch.allow():
+            result = "skipped"
+        else:
+            result = "started" if Snapshot.warm(key) else "pending"
+        Metrics.inc("prefetches_total", result=result)
+        return result
+
+    @staticmethod
+    def categories(games: list[Game]) -> None:
+        """Warm the streams of the first `prefetch.categories` games"""
+        for game in games[: Config.load("prefetch")["categories"]]:
+            Prefetch.warm(f"categories/{game.id}")
+
+    @staticmethod
+    def key(path: str) -> str:
+        """Snapshot key of the page at `path`, or None if it has none"""
+        parts = path.strip("/").split("/")
+        if len(parts) == 2 and parts[0] == "categories" and parts[1].isdigit():
+            game = Game.get_or_none(Game.id == int(parts[1]))
+            return f"categories/{game.id}" if game else None
+        if "/".join(parts) in Snapshot.pages:
+            return "/".join(parts)
+        if len(parts) == 1 and parts[0]:
+            channel = Streamer.get_or_none(Streamer.login == parts[0].lower())
+            return f"channels/{channel.id}/vods" if channel else None
+        return None
+
+
+class Live:
+    """
+    Pushes changes to followed live streams to open index pages. While any
+    page is subscribed to `/events`, one background poller refreshes the live
+    snapshot every `events.interval` seconds, diffs it against the previous
+    one and publishes compact events: `live` (with the rendered card),
+    `offline` and `update` (changed viewer count, title or game)
+    """
+
+    fields = ["viewer_count", "title", "game_id", "game_name", "box_art_url"]
+    condition = threading.Condition()
+    events: deque[tuple[int, str, dict]] = deque(maxlen=200)  # (id, name, data)
+    sequence = 0
+    subscribers = 0
+    retry = 60  # Seconds a subscriber turned away waits before trying again
+    thread: threading.Thread = None
+
+    @staticmethod
+    def subscribe() -> bool:
+        """
+        Count in a subscriber, unless `events.max_subscribers` are open already:
+        each holds one of the server's threads for as long as it is open
+        """
+        with Live.condition:
+            if Live.subscribers >= Config.load("events")["max_subscribers"]:
+                return False
+            Live.subscribers += 1
+            if Live.thread is None or not Live.thread.is_alive():
+                Live.thread = threading.Thread(target=Live.run, daemon=True)
+                Live.thread.start()
+            return True
+
+    @staticmethod
+    def unsubscribe() -> None:
+        with Live.condition:
+            Live.subscribers -= 1
+
+    @staticmethod
+    def run() -> None:
+        """Poll while anyone is subscribed, starting from the current snapshot"""
+        with Snapshot.lock:
+            entry = Snapshot.entries.get("live")
+        previous = {s["user_id"]: s for s in entry[1]} if entry else None
+        while True:
+            with Live.condition:  # Decided with `subscribe`, so none is left unserved
+                if Live.subscribers == 0:
+                    Live.thread = None
+                    return None
+            try:
+                with db.connection_context():
+                    streams = Snapshot.page("live", force=True)
+                current = {stream["user_id"]: stream for stream in streams}
+                if previous is not None:
+                    Live.publish(Live.diff(previous, current))
+                previous = current
+            except Exception as e:
+                Log.warning(f"Polling live streams failed: {e}")
+            time.sleep(Config.load("events")["interval"])
+
+    @staticmethod
+    def diff(old: dict[str, dict], new: dict[str, dict]) -> list[tuple[str, dict]]:
+        """Events turning the `old` live streams (by user id) into the `new`"""
+        events = []
+        for user_id, stream in new.items():
+            if user_id not in old:
+                html = bt.template("streams.tpl", streams=[stream], game=True)
+                events.append(("live", {"user_id": user_id, "html": html}))
+                continue
+            changed = {
+                field: stream[field]
+                for field in Live.fields
+                if stream.get(field) != old[user_id].get(field)
+            }
+            if "game_id" in changed:  # Card is replaced rather than patched
+                changed["html"] = bt.template(
+                    "streams.tpl", streams=[stream], game=True
+                )
+            if changed:
+                events.append(("update", {"user_id": user_id, **changed}))
+        for user_id in old.keys() - new.keys():
+            events.append(("offline", {"user_id": user_id}))
+        return events
+
+    @staticmethod
+    def publish(events: list[tuple[str, dict]]) -> None:
+        with Live.condition:
+            for name, data in events:
+                Live.sequence += 1
+                Live.events.append((Live.sequence, name, data))
+            if events:
+                Live.condition.notify_all()
+
+    @staticmethod
+    def stream(last: int = None):
+        """
+        Event stream body for a subscriber counted in by `Live.subscribe`.
+        Events after id `last` (from `Last-Event-ID` on reconnect) are
+        replayed if still buffered
+        """
+        try:
+            yield "retry: 5000\n\n"
+            with Live.condition:
+                if last is None:
+                    last = Live.sequence
+                elif last > Live.sequence:  # Id from before a restart
+                    last = 0
+            while True:
+                with Live.condition:
+                    if not Live.events or Live.events[-1][0] <= last:
+                        Live.condition.wait(Config.load("events")["keepalive"])
+                    events = [e for e in Live.events if e[0] > last]
+                if not events:
+                    yield ": keepalive\n\n"
+                for sequence, name, data in events:
+                    last = sequence
+                    yield f"id: {sequence}\nevent: {name}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            Live.unsubscribe()
 
 
 @bt.route("/")
 def index():
     """Index of web application. Displays live streams of user's follows"""
-    follows = Db.update_follows()
-    streams = Fetch.stream_info(asyncio.run(Fetch.live(follows)))
-    return bt.template("index.tpl", User=User.get(), streams=streams)
+    build = Build.status()
+    if src := App.deferred("live"):
+        return bt.template(
+            "index.tpl", User=Db.user(), streams=None, src=src, build=build
+        )
+    streams = Snapshot.page("live", bool(bt.request.query.get("refresh")))
+    if bt.request.query.get("part"):
+        return bt.template("streams.tpl", streams=streams, game=True)
+    # A snapshot restored from data.db is shown while the fresh one loads
+    stale = Snapshot.stale("live")
+    src = App.fragment(refresh=True) if stale else None
+    return bt.template(
+        "index.tpl",
+        User=Db.user(),
+        streams=streams,
+        src=src,
+        build=build,
+        stale=stale,
+    )
 
 
 @bt.route("/authenticate")
@@ -472,85 +2597,133 @@ def authenticate():
     if access_token := bt.request.query.get("access_token"):
         User.create_table()
         user = Fetch.user(access_token)
-        App.display(f"Logged in as {user.display_name}")
+        Db.forget()
+        Log.info(f"Logged in as {user.display_name}")
         return bt.redirect("/")
     return bt.template("authenticate.tpl")
 
 
 @bt.route("/<channel>")
-def channel(channel, mode=None, data=None):
-    """Profile page of channel"""
-    try:
-        channel: Streamer = Streamer.get(
-            (Streamer.display_name == channel) | (Streamer.login == channel)
-        )
-    except pw.DoesNotExist:
-        bt.abort(code=404, text="User does not exist")
+def channel(channel, mode=None, src=None):
+    """
+    Profile page of channel. Vods and clips are sent as a fragment the page
+    requests after loading (`part=1`)
+    """
+    channel: Streamer = Db.streamer(channel)
     date = {"start": "", "end": ""}
     if bt.request.query.get("follow"):
-        asyncio.run(Db.toggle_follow({channel}))
+        Session.run(Db.toggle_follow({channel}))
+        Snapshot.expire("live")
+        Sync.request()
         bt.redirect(f"/{channel.login}")
     elif bt.request.query.get("watch"):
-        watch_video(channel.login)
+        Player.watch(channel.login)
         return """<script>setTimeout(function () { window.history.back() });</script>"""
     elif bt.request.query.get("vod"):
         mode = "vod"
-        vods = Helix.get_iter(f"videos?user_id={channel.id}&type=archive")
-        data = process_data(vods, mode)
+        if not (src := App.deferred()):
+            if after := bt.request.query.get("after"):
+                data, cursor = Fetch.channel_vods(channel, after)
+            else:
+                key, refresh = f"channels/{channel.id}/vods", bt.request.query.refresh
+                data, cursor = Snapshot.page(key, bool(refresh))
+            return bt.template("vods.tpl", data=data, cursor=cursor)
     elif bt.request.query.get("clips"):
         mode = "clip"
-        start = bt.request.query.get("start") + "T00:00:00Z"
-        end = bt.request.query.get("end") + "T00:00:00Z"
-        clips = Helix.get(
-            f"clips?broadcaster_id={channel.id}&first=100&started_at={start}&ended_at={end}"
-        )
-        data = process_data(clips, mode="clip")
-        data = sorted(data, key=lambda info: info["view_count"], reverse=True)
-        date = {"start": start[:-10], "end": end[:-10]}
+        date = {"start": bt.request.query.start, "end": bt.request.query.end}
+        if not (src := App.deferred()):
+            data = Fetch.channel_clips(channel, date["start"], date["end"])
+            return bt.template("clips.tpl", data=data)
     elif url := bt.request.query.get("video"):
-        watch_video(mode="vod", url=url)
+        Player.play(url)
         return """<script>setTimeout(function () { window.history.back() });</script>"""
     elif bt.request.query.get("close"):
         bt.redirect(f"/{channel.login}")
-    return bt.template("channel.tpl", channel=channel, mode=mode, data=data, date=date)
+    return bt.template("channel.tpl", channel=channel, mode=mode, date=date, src=src)
+
+
+@bt.route("/build")
+def build():
+    """Progress of the initial cache build"""
+    return bt.template("build.tpl", build=Build.status())
 
 
 @bt.route("/search")
 def search():
     """
-    List results that match search query string and cache results based on id
-    For categories, display data from database based on id
-    For channels, display data from database as well as request data from endpoint
+    List cached channels or categories matching the query string at once.
+    Results only Helix knows of are requested by the page afterwards with
+    `remote=1`, then cached (and indexed) based on id
     """
     query = bt.request.query.q
     t = bt.request.query.t
     mode, model, count = (
         ("games", Game, 10) if t == "categories" else ("users", Streamer, 5)
     )
+    local = Search.find(model, query, limit=count)
+    if not bt.request.query.get("remote"):
+        results = local if mode == "games" else [Result({}, row) for row in local]
+        return bt.template("search.tpl", query=query, t=t, mode=mode, results=results)
+
     search_results = Helix.get(f"search/{t}?query={query}&first={count}")
+    shown = {row.id for row in local}
+    search_results = [r for r in search_results if int(r["id"]) not in shown]
     ids = {int(result["id"]) for result in search_results}
 
-    asyncio.run(Db.cache(ids, mode=mode))
+    Session.run(Db.cache(ids, mode=mode))
     if t == "categories":
         results = model.select().where(model.id.in_(ids))
     else:
-        results = [
-            Result(result, model.get_by_id(int(result["id"])))
-            for result in search_results
+        rows = Db.lookup(model, ids)
+        results = [Result(result, rows[int(result["id"])]) for result in search_results]
+    return bt.template("results.tpl", mode=mode, results=results)
+
+
+@bt.route("/search/local")
+def search_local():
+    """
+    Prefix search of cached channels or categories, answered from data.db.
+    `followed=1` limits channels to follows and returns all matches
+    """
+    t = bt.request.query.t
+    text = bt.request.query.q
+    if t == "categories":
+        games = Search.find(Game, text, limit=10)
+        return {
+            "results": [
+                {"id": g.id, "name": g.name, "box_art_url": g.box_art_url}
+                for g in games
+            ]
+        }
+    followed = bool(bt.request.query.get("followed"))
+    streamers = Search.find(
+        Streamer, text, limit=None if followed else 10, followed=followed
+    )
+    return {
+        "results": [
+            {
+                "id": s.id,
+                "login": s.login,
+                "display_name": s.display_name,
+                "profile_image_url": s.profile_image_url,
+                "followed": s.followed,
+            }
+            for s in streamers
         ]
-    return bt.template("search.tpl", query=query, mode=mode, results=results)
+    }
 
 
 @bt.route("/following")
 def following():
     """Read data.db for users with `followed == True`"""
-    Db.update_follows()
     follows = (
         Streamer.select()
         .where(Streamer.followed == True)
         .order_by(Streamer.display_name)
     )
-    return bt.template("following.tpl", follows=follows)
+    synced = Sync.last()
+    synced = time_elapsed(synced.strftime("%Y-%m-%dT%H:%M:%SZ")) if synced else None
+    return bt.template("following.tpl", follows=follows, synced=synced)
 
 
 @bt.route("/categories/<game_id>")
@@ -561,13 +2734,23 @@ def browse(game_id="all"):
     """
     if game_id == "all":
         return bt.redirect("/top/games")
+    elif not game_id.isdigit():
+        bt.abort(code=404, text=f"Cannot find streams for game id {game_id}")
     else:
         try:
-            game: Game = Game.get(int(game_id))
-            streams = Helix.get(f"streams?first=50&game_id={game_id}")
-            data = Fetch.stream_info(streams)
-            return bt.template("top.tpl", data=data, t="channels_filter", game=game)
-        except httpx.HTTPError:
+            game: Game = Game.get_by_id(int(game_id))
+            key = f"categories/{game.id}"
+            if src := App.deferred(key):
+                return bt.template(
+                    "top.tpl", data=None, t="channels_filter", game=game, src=src
+                )
+            data = Snapshot.page(key, bool(bt.request.query.get("refresh")))
+            if bt.request.query.get("part"):
+                return bt.template("streams.tpl", streams=data, game=False)
+            return bt.template(
+                "top.tpl", data=data, t="channels_filter", game=game, src=None
+            )
+        except (httpx.HTTPError, pw.DoesNotExist):
             bt.abort(code=404, text=f"Cannot find streams for game id {game_id}")
 
 
@@ -577,17 +2760,20 @@ def top(t):
     `/games` View list of top games by total viewer count
     `/streams` View list of top streams across platform
     """
-    if t == "channels":
-        top_streams = Helix.get("streams?first=50")
-        data = Fetch.stream_info(top_streams)
-    elif t == "games":
-        games = [int(g["id"]) for g in Helix.get("games/top?first=100")]
-        asyncio.run(Db.cache(set(games), mode="games"))
-        data = list(Game.select().where(Game.id.in_(games)))
-        data.sort(key=lambda x: games.index(x.id))
-    else:
+    if t not in ["channels", "games"]:
         bt.abort(code=400, text="Not a valid type for /top")
-    return bt.template("top.tpl", data=data, t=t)
+    if src := App.deferred(f"top/{t}"):
+        return bt.template("top.tpl", data=None, t=t, src=src)
+    data = Snapshot.page(f"top/{t}", bool(bt.request.query.get("refresh")))
+    if t == "games":
+        Prefetch.categories(data)
+    if not bt.request.query.get("part"):
+        stale = Snapshot.stale(f"top/{t}")
+        src = App.fragment(refresh=True) if stale else None
+        return bt.template("top.tpl", data=data, t=t, src=src, stale=stale)
+    elif t == "games":
+        return bt.template("games.tpl", games=data)
+    return bt.template("streams.tpl", streams=data, game=True)
 
 
 @bt.route("/settings")
@@ -601,32 +2787,170 @@ def settings():
         Popen(command)
         return bt.redirect("/settings")
     elif bt.request.query.get("cache"):
-        App.display("Clearing cache...")
-        db.drop_tables([Streamer, Game])
-        shutil.os.system(f"rm -f {cachedir}/games/* {cachedir}/users/*")
+        Log.info("Clearing cache...")
+        db.drop_tables([Streamer, Game, State, StreamerIndex, GameIndex])
+        Db.forget()
+        Snapshot.clear()
+        Images.clear()
+        return bt.redirect("/settings")
+    elif pid := bt.request.query.get("kill"):
+        Player.kill(Player.target(pid))
         return bt.redirect("/settings")
     elif bt.request.query.get("logout"):
-        App.display("Logging out...")
-        db.drop_tables([User, Streamer, Game])
+        Log.info("Logging out...")
+        db.drop_tables([User, Streamer, Game, State, StreamerIndex, GameIndex])
+        Db.forget()
+        Snapshot.clear()
         return bt.redirect("/settings")
-    try:
-        config = toml.load(f"{confdir}/static/settings.toml")[f"{os_}"]
-    except toml.TomlDecodeError as e:
-        Popen(command)
-        bt.abort(code=404, text="Could not parse settings.toml")
-    return bt.template("settings.tpl", config=config)
+    return bt.template(
+        "settings.tpl",
+        config=Config.load(os_),
+        images=Images.summary(),
+        metrics=Metrics.summary(),
+        players=Player.list(),
+    )
+
+
+@bt.route("/events")
+def events():
+    """Server-sent events of changes to followed live streams, see `Live`"""
+    bt.response.content_type = "text/event-stream"
+    bt.response.set_header("Cache-Control", "no-cache")
+    last = bt.request.get_header("Last-Event-ID", "")
+    if not Live.subscribe():
+        bt.response.status = 503
+        bt.response.set_header("Retry-After", str(Live.retry))
+        return f"retry: {Live.retry * 1000}\n\n"
+    return Live.stream(int(last) if last.isdigit() else None)
+
+
+@bt.route("/prefetch")
+def prefetch():
+    """Warm the snapshot of the page at `path`, e.g. on hovering a link to it"""
+    if key := Prefetch.key(bt.request.query.path):
+        return {"key": key, "result": Prefetch.warm(key)}
+    return {"key": None, "result": "skipped"}
+
+
+@bt.route("/api/build")
+def api_build():
+    """Progress of the initial cache build as JSON"""
+    return Build.status()
+
+
+@bt.route("/api/players")
+def api_players():
+    """
+    Running players as JSON. `kill=<pid>` stops one player and
+    `kill=all` every player
+    """
+    if pid := bt.request.query.get("kill"):
+        Player.kill(Player.target(pid))
+    return {"data": Player.list()}
+
+
+@bt.route("/api/live")
+def api_live():
+    """Live streams of followed channels as JSON"""
+    return {"data": Snapshot.page("live", bool(bt.request.query.get("refresh")))}
+
+
+@bt.route("/api/top/<t>")
+def api_top(t):
+    """Top streams (`channels`) or top `games` as JSON"""
+    if t not in ["channels", "games"]:
+        bt.abort(code=400, text="Not a valid type for /api/top")
+    data = Snapshot.page(f"top/{t}", bool(bt.request.query.get("refresh")))
+    if t == "games":
+        data = [model_to_dict(game) for game in data]
+    return {"data": data}
+
+
+@bt.route("/api/categories/<game_id:int>")
+def api_category(game_id):
+    """Top streams of a category as JSON"""
+    if Game.get_or_none(Game.id == game_id) is None:
+        bt.abort(code=404, text=f"Game id {game_id} is not cached")
+    key = f"categories/{game_id}"
+    return {"data": Snapshot.page(key, bool(bt.request.query.get("refresh")))}
+
+
+@bt.route("/api/channels/<channel>/vods")
+def api_vods(channel):
+    """One page of a channel's vods as JSON, continued with `after=<cursor>`"""
+    vods, cursor = Fetch.channel_vods(Db.streamer(channel), bt.request.query.after)
+    return {"data": vods, "cursor": cursor}
+
+
+@bt.route("/api/channels/<channel>/clips")
+def api_clips(channel):
+    """A channel's clips between `start` and `end` (YYYY-MM-DD) as JSON"""
+    query = bt.request.query
+    if not (query.start and query.end):
+        bt.abort(code=400, text="start and end dates are required")
+    return {"data": Fetch.channel_clips(Db.streamer(channel), query.start, query.end)}
+
+
+@bt.route("/metrics")
+def metrics():
+    """Counters and histograms in Prometheus text format"""
+    bt.response.content_type = "text/plain; version=0.0.4; charset=utf-8"
+    return Metrics.render()
 
 
 @bt.route("/static/<filename:path>")
 def send_static(filename):
-    """Serve files located in configuration directory"""
-    return bt.static_file(filename, root=f"{confdir}/static/")
+    """
+    Serve files located in configuration directory, using a precompressed
+    copy of text files when the browser accepts gzip
+    """
+    root = f"{confdir}/static/"
+    headers = {"Cache-Control": "public, max-age=3600", "Vary": "Accept-Encoding"}
+    if (
+        filename.endswith(App.compressible)
+        and "gzip" in bt.request.get_header("Accept-Encoding", "")
+        and shutil.os.path.isfile(f"{root}{filename}")
+    ):
+        try:
+            compressed = gzipped(f"{root}{filename}")
+        except OSError:
+            compressed = None  # Static directory not writable
+        if compressed:
+            return bt.static_file(
+                shutil.os.path.relpath(compressed, root),
+                root=root,
+                mimetype=mimetypes.guess_type(filename)[0],
+                headers={**headers, "Content-Encoding": "gzip"},
+            )
+    return bt.static_file(filename, root=root, headers=headers)
 
 
 @bt.route("/cache/<filename:path>")
 def cache(filename):
     """Serve images cached in ~/.cache/twitch-py"""
-    return bt.static_file(filename, root=f"{cachedir}/")
+    if not Images.ensure(filename) and (url := Images.source(filename)):
+        return bt.redirect(url)  # Could not be downloaded again
+    etag, headers = Images.headers(filename)
+    return bt.static_file(filename, root=f"{cachedir}/", etag=etag, headers=headers)
+
+
+@bt.route("/thumb/<key:path>")
+def thumb(key):
+    """Serve a live, vod or clip thumbnail through `Thumbs`"""
+    try:
+        entry = Thumbs.get(key)
+    except httpx.HTTPError:
+        if url := Thumbs.source(key):
+            return bt.redirect(url)
+        entry = None
+    if entry is None:
+        bt.abort(code=404, text="Unknown thumbnail")
+    fetched_at, image, etag = entry
+    max_age = max(int(fetched_at + Thumbs.ttl(key) - time.time()), 0)
+    headers = {"Cache-Control": f"public, max-age={max_age}", "ETag": etag}
+    if bt.request.get_header("If-None-Match") == etag:
+        return bt.HTTPResponse(status=304, **headers)
+    return bt.HTTPResponse(image, **headers, Content_Type="image/jpeg")
 
 
 @bt.error(400)
@@ -649,10 +2973,39 @@ def error502(error):
     return bt.template("error_page.tpl", code=App.errors[502], error=error)
 
 
-def time_elapsed(start: str, d="") -> str:
-    """Use 'started_at' key and current time to calculated time since"""
-    start = datetime.strptime(start, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
-    current = datetime.now(tz=timezone.utc)
+def write_file(path: str, content: bytes) -> None:
+    """Replace file at `path` so readers never see a partial file"""
+    folder = shutil.os.path.dirname(path)
+    shutil.os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, suffix=".part")
+    try:
+        with shutil.os.fdopen(fd, "wb") as f:
+            f.write(content)
+        shutil.os.replace(tmp, path)
+    except OSError:
+        shutil.os.remove(tmp)
+        raise
+
+
+def gzipped(path: str) -> str:
+    """Path of a gzip copy of the file at `path`, (re)built if out of date"""
+    try:
+        if shutil.os.path.getmtime(f"{path}.gz") >= shutil.os.path.getmtime(path):
+            return f"{path}.gz"
+    except OSError:
+        pass
+    with open(path, "rb") as f:
+        write_file(f"{path}.gz", gzip.compress(f.read(), mtime=0))
+    return f"{path}.gz"
+
+
+def time_elapsed(start: str, d="", now: datetime = None) -> str:
+    """
+    Use 'started_at' key and current time to calculated time since.
+    Pass `now` to measure a whole list of items against the same moment
+    """
+    start = datetime.fromisoformat(start.replace("Z", "+00:00"))
+    current = now or datetime.now(tz=timezone.utc)
     elapsed = round((current - start).total_seconds())
     delta = str(timedelta(seconds=elapsed))
     if "d" in delta:
@@ -661,62 +3014,42 @@ def time_elapsed(start: str, d="") -> str:
     return f"{d}{h}h{m}m"
 
 
-def watch_video(channel: str = "", mode: str = "live", url: str = "") -> None:
-    """
-    Save process if of running video as App attribute for later termination.
-    Passes through player and arg settings from `settings.toml`.
-    """
-    c = toml.load(f"{confdir}/static/settings.toml")[f"{os_}"]
-    if c["multi"] is False and App.process is not None:
-        App.process.terminate()
-    if mode == "live":
-        App.display(f"Launching stream twitch.tv/{channel}")
-        command = f'streamlink -l none -p {c["app"]} -a "{c["args"]}" \
-                --twitch-disable-ads --twitch-low-latency twitch.tv/{channel} best'
-    else:
-        App.display(f"Launching video: {url}")
-        command = f'{c["app"]} {c["args"]} --really-quiet {url}'
-    p = Popen(lex(command), stdout=DEVNULL)
-    if c["multi"] is False:
-        App.process = p
-
-
 def process_data(data: list[dict], mode: str) -> list[dict]:
     """
     Format data of vod/clip for presenting. For clips, cache game data
     and fetch relevant vod with timestamp of clip.
     """
+    now = datetime.now(tz=timezone.utc)
     if mode == "vod":
         for vod in data:
-            vod["thumbnail_url"] = vod["thumbnail_url"].replace(
-                "%{width}x%{height}", "480x270"
-            )
-            if not vod["thumbnail_url"]:
+            if vod["thumbnail_url"]:
+                vod["thumbnail_url"] = Thumbs.register(
+                    f"vod/{vod['id']}",
+                    vod["thumbnail_url"].replace("%{width}x%{height}", Thumbs.size),
+                )
+            else:
                 vod[
                     "thumbnail_url"
                 ] = "https://vod-secure.twitch.tv/_404/404_processing_320x180.png"
-            vod["created_at"] = time_elapsed(vod["created_at"])
+            vod["created_at"] = time_elapsed(vod["created_at"], now=now)
     if mode == "clip":
         for clip in data:
             clip.setdefault(
                 "box_art_url", "https://static-cdn.jtvnw.net/ttv-static/404_boxart.jpg"
             )
             clip.setdefault("game_name", "Streaming")
-            clip["time_since"] = time_elapsed(clip["created_at"])
-            clip["thumbnail_url"] = clip["thumbnail_url"].rsplit("-", 1)[0] + ".jpg"
-        asyncio.run(
-            Db.cache(
-                {int(gid) for clip in data if (gid := clip["game_id"])}, mode="games"
+            clip["time_since"] = time_elapsed(clip["created_at"], now=now)
+            clip["thumbnail_url"] = Thumbs.register(
+                f"clip/{clip['id']}", clip["thumbnail_url"]  # A 480x272 preview
             )
-        )
+        ids = {int(gid) for clip in data if (gid := clip["game_id"])}
+        Session.run(Db.cache(ids, mode="games"))
+        games = Db.lookup(Game, ids)
         for clip in data:
-            try:
-                game: Game = Game.get(int(clip["game_id"]))
+            if (gid := clip["game_id"]) and (game := games.get(int(gid))):
                 clip["box_art_url"] = game.box_art_url
                 clip["game_name"] = game.name
-            except ValueError:
-                pass
-        asyncio.run(vod_from_clip(data))
+        Session.run(vod_from_clip(data))
     return data
 
 
@@ -725,18 +3058,10 @@ async def vod_from_clip(clips: list[dict]) -> list[dict]:
     Fetch vod clip was taken from if it exists. Calculate timestamp of clip in
     vod using formatted date strings.
     """
-    to_fetch = [vod_id for clip in clips if (vod_id := clip["video_id"])]
-    async with httpx.AsyncClient(headers=Helix.headers(), timeout=None) as session:
-        vod_data = await asyncio.gather(
-            *(
-                session.get(f"{Helix.endpoint}/videos?id={vod_id}")
-                for vod_id in to_fetch
-            )
-        )
-    vods = [resp.json()["data"][0] for resp in vod_data]
+    vods = await Fetch.vods({vod_id for clip in clips if (vod_id := clip["video_id"])})
     for clip in clips:
-        if clip["video_id"]:
-            clip["vod"] = vods.pop(0)  # Consume vod if vod exists for clip
+        if (vod := vods.get(clip["video_id"])) is not None:
+            clip["vod"] = dict(vod)
             vod_id, timestamp = clip["video_id"], clip["created_at"]
             vod_start = datetime.strptime(
                 clip["vod"]["created_at"], "%Y-%m-%dT%H:%M:%SZ"
@@ -779,27 +3104,31 @@ if __name__ == "__main__":
     """
     arg = shutil.sys.argv[1:]
     if not arg:
-        App.display("Launching server...")
+        Log.info("Launching server...")
+        Sync.start()
+        Player.start()
         try:
             serve(app=bt.app(), host="localhost", threads=16, port=8080)
         except KeyboardInterrupt:
             pass
         except httpx.HTTPError as e:
-            App.display(f"Error: {e}. Retrying...")
+            Log.error(f"Error: {e}. Retrying...")
             bt.redirect(bt.request.path)
         finally:
-            App.display("Exiting...")
+            Images.save()
+            Session.close()
+            Log.info("Exiting...")
     elif len(arg) > 1:
         print("Too many arguments. Use -h for help")
     elif arg[0] in ["-h", "--help", "help"]:
         print(docs)
     elif arg[0] in ["-c", "--clear-cache"]:
         try:
-            App.display("Clearing cache...")
-            db.drop_tables([Streamer, Game])
-            shutil.os.system(f"rm -f {cachedir}/games/* {cachedir}/users/*")
+            Log.info("Clearing cache...")
+            db.drop_tables([Streamer, Game, State, StreamerIndex, GameIndex])
+            Images.clear()
         except pw.OperationalError:
-            App.display("Database or cache does not exist")
+            Log.warning("Database or cache does not exist")
     elif arg[0] in ["--update", "update"]:
         install("d")
     elif arg[0] in ["--uninstall", "uninstall"]:
@@ -810,4 +3139,5 @@ if __name__ == "__main__":
     else:
         print("Command not recognized. Use -h for help")
         print(docs)
+    Log.flush()  # Records the renderer has not printed yet
     shutil.sys.exit()
@@ -37,5 +37,25 @@
         <footer>
             <p>Written by Raeed Ahmed</p>
         </footer>
+        <script>
+            // Sections sent empty are filled in from their fragment url
+            document.querySelectorAll("[data-src]:not([data-src=''])").forEach(function (section) {
+                fetch(section.dataset.src).then(function (resp) { return resp.text(); }).then(function (html) {
+                    section.innerHTML = html;
+                    document.querySelectorAll(".stale").forEach(function (notice) { notice.remove(); });
+                    section.dispatchEvent(new Event("loaded"));
+                });
+            });
+            // Hovering a category or channel link warms the page it leads to
+            var prefetched = new Set();
+            document.addEventListener("mouseover", function (e) {
+                var link = e.target.closest && e.target.closest("main a[href^='/']");
+                if (!link || link.search || prefetched.has(link.pathname)) {
+                    return;
+                }
+                prefetched.add(link.pathname);
+                fetch("/prefetch?path=" + encodeURIComponent(link.pathname));
+            });
+        </script>
     </body>
 </html>
\ No newline at end of file
@@ -0,0 +1,31 @@
+% rebase('base.tpl', title="Building cache")
+<header>
+    <h1>Building cache</h1>
+</header>
+<main>
+    <table>
+        <tbody>
+            <tr><td> state </td><td id="state"> {{build["state"]}} </td></tr>
+            <tr><td> cached </td><td id="cached"> {{build.get("cached", 0)}} of {{build.get("total", "?")}} followed channels </td></tr>
+            <tr><td> rate </td><td id="rate"> {{build.get("per_second") or "-"}} channels/s </td></tr>
+            <tr><td> time left </td><td id="eta"> {{build.get("eta_seconds") or "-"}} s </td></tr>
+        </tbody>
+    </table>
+    <p><a href="/">Home</a> shows followed channels that are live while the rest are cached.</p>
+</main>
+<script>
+    function poll() {
+        fetch("/api/build").then(function (resp) { return resp.json(); }).then(function (build) {
+            document.getElementById("state").textContent = build.state;
+            if (build.state === "done") {
+                document.getElementById("eta").textContent = "0 s";
+                return;
+            }
+            document.getElementById("cached").textContent = (build.cached || 0) + " of " + (build.total || "?") + " followed channels";
+            document.getElementById("rate").textContent = (build.per_second || "-") + " channels/s";
+            document.getElementById("eta").textContent = (build.eta_seconds || "-") + " s";
+            setTimeout(poll, 1000);
+        });
+    }
+    setTimeout(poll, 1000);
+</script>
\ No newline at end of file
@@ -19,53 +19,27 @@
     </form>
 </section>
 <h3>{{ {"vod":"Past Broadcasts","clip":"Clips"}.get(mode) or "VODs will appear here"}}</h3>
-<main class="grid">
-    % if mode == "vod":
-        % for vod in data:
-        <article class="card">
-            <p title="{{vod['title']}}">{{vod['title']}}</p>
-            <div class="thumbnail">
-                <a href="?video={{vod['url']}}"><img src="{{vod['thumbnail_url']}}" alt="" loading="lazy" width=100% height=100%></a>
-                <div class="tr">
-                    <i class="gg-calendar-dates"></i>
-                    <b>{{vod['created_at']}}</b>
-                </div>
-                <div class="bl">
-                    <i class="gg-time"></i>
-                    <b>{{vod["duration"]}}</b>
-                </div>
-                <div class="br">
-                    <i class="gg-eye"></i>
-                    <b>{{vod['view_count']}}</b>
-                </div>
-            </div>
-        </article>
-        % end
-    % end
-    % if mode == "clip":
-        % for clip in data:
-            <article class="card">
-                <p title="{{clip['title']}}">{{clip['title']}}</p>
-                <div class="thumbnail">
-                    <a href="?video={{clip['url']}}"><img src="{{clip['thumbnail_url']}}" alt="" width="100%" height="100%" loading="lazy"></a>
-                    <div class="tr">
-                        <i class="gg-calendar-dates"></i>
-                        <b>{{clip['time_since']}}</b>
-                    </div>
-                    <div class="br">
-                        <i class="gg-eye"></i>
-                        <b>{{clip['view_count']}}</b>
-                    </div>
-                </div>
-                % if clip['game_id']:
-                <p><a href="/categories/{{clip['game_id']}}"><img src="{{clip['box_art_url']}}" alt="" width="50" loading="lazy"></a>  {{clip['game_name']}}</p>
-                % end
-                % if clip['vod_link']:
-                <form action="" method="get" id="video">
-                    <button name="video" value="{{clip['vod_link']}}" form="video">View VOD</button>
-                </form>
-                % end
-            </article>
-        % end
-    % end
-</main>
+<main class="grid" data-src="{{src or ''}}"></main>
+% if mode == "vod":
+<button id="more" onclick="loadMore()" hidden>Load more</button>
+<script>
+    function loadMore() {
+        var button, cursor, url;
+        button = document.getElementById("more");
+        cursor = document.querySelectorAll("main [data-cursor]");
+        cursor = cursor[cursor.length - 1].dataset.cursor;
+        url = window.location.pathname + "?vod=archive&part=1&after=" + encodeURIComponent(cursor);
+        button.disabled = true;
+        fetch(url).then(function (resp) { return resp.text(); }).then(function (html) {
+            document.querySelector("main.grid").insertAdjacentHTML("beforeend", html);
+            showMore();
+            button.disabled = false;
+        });
+    }
+    function showMore() {
+        var cursor = document.querySelectorAll("main [data-cursor]");
+        document.getElementById("more").hidden = !cursor[cursor.length - 1].dataset.cursor;
+    }
+    document.querySelector("main.grid").addEventListener("loaded", showMore);
+</script>
+% end
@@ -0,0 +1,24 @@
+% for clip in data:
+<article class="card">
+    <p title="{{clip['title']}}">{{clip['title']}}</p>
+    <div class="thumbnail">
+        <a href="?video={{clip['url']}}"><img src="{{clip['thumbnail_url']}}" alt="" width="100%" height="100%" loading="lazy"></a>
+        <div class="tr">
+            <i class="gg-calendar-dates"></i>
+            <b>{{clip['time_since']}}</b>
+        </div>
+        <div class="br">
+            <i class="gg-eye"></i>
+            <b>{{clip['view_count']}}</b>
+        </div>
+    </div>
+    % if clip['game_id']:
+    <p><a href="/categories/{{clip['game_id']}}"><img src="{{clip['box_art_url']}}" alt="" width="50" loading="lazy"></a>  {{clip['game_name']}}</p>
+    % end
+    % if clip['vod_link']:
+    <form action="" method="get" id="video">
+        <button name="video" value="{{clip['vod_link']}}" form="video">View VOD</button>
+    </form>
+    % end
+</article>
+% end
\ No newline at end of file
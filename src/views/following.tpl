@@ -1,32 +1,48 @@
 % rebase('base.tpl', title="Following")
 <header>
     <h1>Following {{len(follows)}} streamers</h1>
+    % if synced:
+    <p>Synced {{synced}} ago</p>
+    % end
 </header>
-<input type="text" id="nameFilter" onkeyup="filterFunction()" placeholder="Filter by name...">
+<input type="text" id="nameFilter" oninput="filterFunction()" placeholder="Filter by name...">
 <p></p>
 <section id="follow">
     % for follow in follows:
-    <article>
+    <article data-id="{{follow.id}}">
         <a href="/{{follow.login}}"><img src="{{follow.profile_image_url}}" alt="" width="75" loading="lazy"></a>
         <p>{{follow.display_name}}</p>
     </article>
     % end
 </section>
 <script>
+    var articles = {}, hidden = new Set(), timer;
+    document.querySelectorAll("#follow article").forEach(function (article) {
+        articles[article.dataset.id] = article;
+    });
+    function showOnly(ids) {
+        // Only articles whose visibility changes are touched
+        Object.keys(articles).forEach(function (id) {
+            var hide = ids !== null && !ids.has(id);
+            if (hide !== hidden.has(id)) {
+                articles[id].style.display = hide ? "none" : "";
+                hide ? hidden.add(id) : hidden.delete(id);
+            }
+        });
+    }
     function filterFunction() {
-        var input, filter, section, article, p, i, txt;
-        input = document.getElementById("nameFilter");
-        filter = input.value.toUpperCase();
-        section = document.getElementById("follow");
-        article = section.getElementsByTagName("article");
-        for (i=0;i<article.length;i++){
-            p = article[i].getElementsByTagName("p")[0];
-            txt = p.textContent || p.innerText;
-            if(txt.toUpperCase().indexOf(filter) > -1) {
-                article[i].style.display = "";
-            } else {
-                article[i].style.display = "none"
+        // Matched against the local search index once typing pauses
+        clearTimeout(timer);
+        timer = setTimeout(function () {
+            var query = document.getElementById("nameFilter").value.trim();
+            if (!query) {
+                return showOnly(null);
             }
-        }
+            fetch("/search/local?t=channels&followed=1&q=" + encodeURIComponent(query))
+                .then(function (resp) { return resp.json(); })
+                .then(function (body) {
+                    showOnly(new Set(body.results.map(function (r) { return String(r.id); })));
+                });
+        }, 150);
     }
 </script>
\ No newline at end of file
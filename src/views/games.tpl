@@ -0,0 +1,6 @@
+% for game in games:
+<article>
+    <a href="/categories/{{game.id}}"><img src="{{game.box_art_url}}" alt="top streams" height="100" loading="lazy"></a>
+    <p>{{game.name}}</p>
+</article>
+% end
\ No newline at end of file
@@ -1,22 +1,58 @@
 % rebase('base.tpl', title="Home - "+User.display_name, user=User)
-<main class="grid">
-    % for stream in streams:
-        <article class="card">
-            <h3><a href="{{stream['user_login']}}"><img src="{{stream['profile_image_url']}}" alt="{{stream['user_name']}}" width="75"></a>  {{stream["user_name"]}}</h3>
-            <p title="{{stream['title']}}">{{stream['title']}}</p>
-            <div class="thumbnail">
-                <a href="{{stream['user_login']}}?watch=live"><img src="{{stream['thumbnail_url']}}" alt="{{stream['title']}}" width=100% height=100% loading="lazy"></a>
-                <div class="bl">
-                    <i class="gg-timer"></i>
-                    <b>{{stream['uptime']}}</b>
-                </div> 
-                <div class="br">
-                    <i class="gg-user"></i>
-                    <b> {{stream['viewer_count']}}</b>
-                </div>
-            </div>
-            <p><a href="/categories/{{stream['game_id']}}"><img src="{{stream['box_art_url']}}" alt="{{stream['game_name']}}" width = 50 loading="lazy"></a>  {{stream['game_name']}}</p>
-        </article>
+% if build["state"] != "done":
+<p>Building cache: {{build.get("cached", 0)}} of {{build.get("total", "?")}} followed channels cached. <a href="/build">Progress</a></p>
+% end
+% if get('stale'):
+<p class="stale">Showing live channels as of {{stale.astimezone().strftime("%b %d %H:%M")}}, refreshing…</p>
+% end
+<main class="grid" data-src="{{src or ''}}">
+    % if streams is not None:
+    % include('streams.tpl', streams=streams, game=True)
     % end
 </main>
-
+<script>
+    // Followed channels going live, offline or changing are patched in place
+    function card(data) {
+        return document.querySelector('main.grid article[data-user="' + data.user_id + '"]');
+    }
+    function listen() {
+        var events = new EventSource("/events");
+        events.addEventListener("live", function (e) {
+            var data = JSON.parse(e.data);
+            if (!card(data)) {
+                document.querySelector("main.grid").insertAdjacentHTML("afterbegin", data.html);
+            }
+        });
+        events.addEventListener("offline", function (e) {
+            var article = card(JSON.parse(e.data));
+            if (article) {
+                article.remove();
+            }
+        });
+        events.addEventListener("update", function (e) {
+            var data = JSON.parse(e.data), article = card(data), title;
+            if (!article) {
+                return;
+            }
+            if (data.html) {
+                article.outerHTML = data.html;
+                return;
+            }
+            if (data.viewer_count !== undefined) {
+                article.querySelector('[data-field="viewer_count"]').textContent = " " + data.viewer_count;
+            }
+            if (data.title !== undefined) {
+                title = article.querySelector('[data-field="title"]');
+                title.textContent = data.title;
+                title.title = data.title;
+            }
+        });
+        events.addEventListener("error", function () {
+            // Turned away (503) while every event slot is taken: try again later
+            if (events.readyState === EventSource.CLOSED) {
+                setTimeout(listen, 60000);
+            }
+        });
+    }
+    listen();
+</script>
\ No newline at end of file
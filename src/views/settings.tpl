@@ -16,6 +16,56 @@
         </tbody>
     </table>
     <br>
+    <table>
+        <thead>
+            <tr>
+                <th colspan="2">Image cache</th>
+            </tr>
+        </thead>
+        <tbody>
+            % for key in images:
+            <tr>
+                <td> {{key}} </td>
+                <td> {{images[key]}} </td>
+            </tr>
+            % end
+        </tbody>
+    </table>
+    <br>
+    % if players:
+    <table>
+        <thead>
+            <tr>
+                <th colspan="2">Players</th>
+            </tr>
+        </thead>
+        <tbody>
+            % for player in players:
+            <tr>
+                <td> {{player["title"]}} </td>
+                <td><form action="" method="get"><button name="kill" value="{{player['pid']}}">Stop</button></form></td>
+            </tr>
+            % end
+        </tbody>
+    </table>
+    <br>
+    % end
+    <table>
+        <thead>
+            <tr>
+                <th colspan="2">Metrics (<a href="/metrics">/metrics</a>)</th>
+            </tr>
+        </thead>
+        <tbody>
+            % for key in metrics:
+            <tr>
+                <td> {{key}} </td>
+                <td> {{metrics[key]}} </td>
+            </tr>
+            % end
+        </tbody>
+    </table>
+    <br>
     <form action="" method="get" id="open"><button name="open" value="true" type="submit">Open Settings</button></form>
     <br>
     <form action="" method="get" id="cache"><button name="cache" value="cache" type="submit">Clear Cache</button></form>
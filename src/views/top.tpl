@@ -7,40 +7,22 @@
 % end
 </header>
 % if t == "games":
-<main id="top_games">
-% for game in data:
-    <article>
-        <a href="/categories/{{game.id}}"><img src="{{game.box_art_url}}" alt="top streams" height="100" loading="lazy"></a>
-        <p>{{game.name}}</p>
-    </article>
+% if get('stale'):
+<p class="stale">Showing top games as of {{stale.astimezone().strftime("%b %d %H:%M")}}, refreshing…</p>
+% end
+<main id="top_games" data-src="{{src or ''}}">
+% if data is not None:
+% include('games.tpl', games=data)
 % end
 </main>
 % end
 % if t in ["channels", "channels_filter"]:
-<main class="grid">
-% for stream in data:
-    <article class="card">
-        <h3><a href="/{{stream['user_login']}}"><img src="{{stream['profile_image_url']}}" alt="channel page" width="75"></a>  {{stream["user_name"]}}</h3>
-        <p title="{{stream['title']}}">{{stream['title']}}</p>
-        <div class="thumbnail">
-            <a href="/{{stream['user_login']}}?watch=live"><img src="{{stream['thumbnail_url']}}" alt="{{stream['title']}}" width=100% height=100% loading="lazy"></a>
-            <div class="bl">
-                <i class="gg-timer"></i>
-                <b>{{stream['uptime']}}</b>
-            </div>
-            <div class="br">
-                <i class="gg-user"></i>
-                <b> {{stream['viewer_count']}}</b>
-            </div>
-        </div>
-        % if t == "channels":
-        <p><a href="/categories/{{stream['game_id']}}"><img src="{{stream['box_art_url']}}" alt="top streams" width = 50 loading="lazy"></a>  {{stream['game_name']}}</p>
-        % end
-    </article>
+% if get('stale'):
+<p class="stale">Showing top channels as of {{stale.astimezone().strftime("%b %d %H:%M")}}, refreshing…</p>
 % end
-</main>
+<main class="grid" data-src="{{src or ''}}">
+% if data is not None:
+% include('streams.tpl', streams=data, game=t == "channels")
 % end
-
-
-
-
+</main>
+% end
\ No newline at end of file
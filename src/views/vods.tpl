@@ -0,0 +1,21 @@
+% for vod in data:
+<article class="card">
+    <p title="{{vod['title']}}">{{vod['title']}}</p>
+    <div class="thumbnail">
+        <a href="?video={{vod['url']}}"><img src="{{vod['thumbnail_url']}}" alt="" loading="lazy" width=100% height=100%></a>
+        <div class="tr">
+            <i class="gg-calendar-dates"></i>
+            <b>{{vod['created_at']}}</b>
+        </div>
+        <div class="bl">
+            <i class="gg-time"></i>
+            <b>{{vod["duration"]}}</b>
+        </div>
+        <div class="br">
+            <i class="gg-eye"></i>
+            <b>{{vod['view_count']}}</b>
+        </div>
+    </div>
+</article>
+% end
+<span data-cursor="{{cursor or ''}}" hidden></span>
@@ -0,0 +1,52 @@
+"""
+Concurrency checks for `Flight`, run with `python -m pytest tests`. `main`
+is imported with a throwaway home directory, as in bench/
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+os.environ["HOME"] = tempfile.mkdtemp(prefix="twitch-py-test-")
+os.makedirs(f"{os.environ['HOME']}/.config/twitch-py")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import main  # noqa: E402
+
+
+def test_waiters_copy_while_leader_modifies_result():
+    """The leader changing its result must not break or leak into waiters' copies"""
+    for trial in range(50):
+        started = threading.Event()
+        key = ("test", trial)
+        results, errors = [], []
+
+        def work():
+            started.set()
+            time.sleep(0.01)  # Lets the waiters line up on the key
+            return [{"id": i, "tags": list(range(50))} for i in range(200)]
+
+        def leader():
+            data = main.Flight.do(key, work)
+            for item in data:  # As process_data does with Helix data
+                item.update({f"extra{n}": n for n in range(20)})
+                item["tags"].clear()
+
+        def waiter():
+            started.wait()
+            try:
+                results.append(main.Flight.do(key, work))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=leader)]
+        threads += [threading.Thread(target=waiter) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        for data in results:
+            assert all(len(item) == 2 and len(item["tags"]) == 50 for item in data)